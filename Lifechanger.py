@@ -7,13 +7,36 @@ import random
 import asyncio
 import logging
 import re
-import requests
+import atexit
+import bisect
+import heapq
+import tempfile
+import threading
+from collections import namedtuple
+from dataclasses import dataclass, field
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from bs4 import BeautifulSoup
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from pyrogram import Client
+except ImportError:
+    Client = None
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 from urllib.parse import urlparse
 from telegram import Update, Poll, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    Application, CommandHandler, ContextTypes, PollHandler, CallbackQueryHandler,
+    Application, CommandHandler, ContextTypes, PollAnswerHandler, CallbackQueryHandler,
     ConversationHandler, MessageHandler, filters
 )
+from telegram.request import HTTPXRequest
 
 # Configure logging
 logging.basicConfig(
@@ -30,21 +53,393 @@ CLONE_URL, CLONE_MANUAL = range(7, 9)
 # Get bot token from environment
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# Public HTTPS base URL for webhook mode; when unset the bot long-polls instead
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+
+# Seconds Telegram holds a getUpdates call open while waiting for updates (its maximum)
+POLLING_TIMEOUT = 50
+
 # Create data directory if it doesn't exist
 os.makedirs('data', exist_ok=True)
 
 # File paths
 QUESTIONS_FILE = 'data/questions.json'
+# Single-question changes are appended here and folded into QUESTIONS_FILE at shutdown
+# or once the journal holds JOURNAL_COMPACT_ENTRIES changes
+QUESTIONS_JOURNAL = 'data/questions.journal'
+JOURNAL_COMPACT_ENTRIES = 500
 USERS_FILE = 'data/users.json'
 
+# Shared async HTTP client so requests to t.me reuse connections
+# without blocking the bot's event loop
+_HTTPX = httpx.AsyncClient(
+    headers={
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    },
+    timeout=5.0,
+    follow_redirects=True
+)
+
+# Hosts that serve public Telegram message links
+TELEGRAM_HOSTS = ('t.me', 'www.t.me', 'telegram.me', 'www.telegram.me')
+
+# Keyboards that never change are built once
+TIMER_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("15 seconds", callback_data="timer_15"),
+    InlineKeyboardButton("30 seconds", callback_data="timer_30"),
+]])
+
+# Categories offered when saving a question, laid out as keyboard rows
+CATEGORY_ROWS = (
+    ("Geography", "Science", "History"),
+    ("Literature", "Sports", "Entertainment"),
+    ("General Knowledge", "Other"),
+)
+ALL_CATEGORIES = tuple(cat for row in CATEGORY_ROWS for cat in row)
+
+def _category_markup(prefix):
+    """Build the category keyboard whose buttons send prefix + category name"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(cat, callback_data=f"{prefix}{cat}") for cat in row]
+        for row in CATEGORY_ROWS
+    ])
+
+ADD_CAT_MARKUP = _category_markup("category_")
+CLONE_CAT_MARKUP = _category_markup("clone_cat_")
+POLL_CAT_MARKUP = _category_markup("pollcat_")
+
+# ID choices offered when saving a converted poll
+_PREFIX_USE = "pollid_use_"
+_PREFIX_CUSTOM = "pollcustom_"
+_POLL_ID_METHOD_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔢 Auto ID", callback_data="pollid_auto"),
+        InlineKeyboardButton("🔢 Custom ID", callback_data="pollid_custom")
+    ],
+    [InlineKeyboardButton("🔄 Existing ID", callback_data="pollid_existing")]
+])
+_POLL_CUSTOM_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("1000", callback_data=f"{_PREFIX_CUSTOM}1000")],
+    [InlineKeyboardButton("2000", callback_data=f"{_PREFIX_CUSTOM}2000")],
+    [InlineKeyboardButton("Custom", callback_data=f"{_PREFIX_CUSTOM}input")]
+])
+
+@lru_cache(maxsize=256)
+def _use_id_callback(question_id):
+    """Return the callback data for the button that reuses an existing ID"""
+    return f"{_PREFIX_USE}{question_id}"
+
+# Confirmation shown once a converted poll is saved; the constant closing
+# lines are baked into each variant so a save is a single format pass
+_POLL_SAVED_HEAD = (
+    "✅ *Quiz question #{question_id} saved successfully!*\n\n"
+    "📝 *Question:* {question}\n"
+    "📋 *Options:* {option_count}\n"
+    "✳️ *Correct Answer:* {answer}\n"
+    "📚 *Category:* {category}\n\n"
+)
+_POLL_SAVED_BATCH_TEMPLATE = _POLL_SAVED_HEAD + (
+    "🔄 Batch mode is active. Reply to another poll with /poll2q to continue adding questions.\n"
+    "IDs will auto-increment from the last used ID."
+)
+_POLL_SAVED_TEMPLATE = _POLL_SAVED_HEAD + (
+    "You can now use:\n"
+    "• /quiz to start a quiz\n"
+    "• /category to choose a quiz by category\n"
+    "• /quiz id={question_id} to quiz with this exact question"
+)
+
+# Number badges for the first ten poll options
+_OPT_EMOJI = ("1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟")
+
+DELETE_YES_LABEL = "Yes, delete it"
+DELETE_NO_LABEL = "No, cancel"
+
+# Patterns used when extracting quizzes from Telegram messages and pages
+_OPT_PREFIX = re.compile(r'^(?:[A-Za-z]|\d+)[.)]\s*')
+# channel/message_id part of a t.me link pasted without a scheme
+_TME_RE = re.compile(r't\.me/([^/\s]+/\d+)')
+
+# /quiz arguments: id=X, start=X or a plain question count
+_QUIZ_ARG_RE = re.compile(r'^(?:id=(\d+)|start=(\d+)|(\d+))$')
+
+# Random source used to pick quiz questions
+_RNG = random.Random()
+
+# Only the start of a fetched page is parsed, which bounds the work per /clone
+MAX_PAGE_SIZE = 512 * 1024
+
+# Pyrogram client used to read channel messages, started with the bot
+_PYROGRAM_CLIENT = None
+_PYROGRAM_LOCK = asyncio.Lock()
+
+# Serializes the ID-pick-and-store step of poll conversions
+_POLL_SAVE_LOCK = asyncio.Lock()
+
+# Pending question and user changes are written this long after the first change
+# (seconds), so a burst of edits shares one write
+FLUSH_DELAY = 0.2
+_FLUSH_TASK = None
+
+# Data file reads and writes run one at a time on this thread, off the event loop
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='data-io')
+
+async def _run_io(func):
+    """Run a blocking data file operation on the I/O thread"""
+    return await asyncio.get_running_loop().run_in_executor(_IO_EXECUTOR, func)
+
+# In-memory copies of the JSON files, keyed by the file's (mtime_ns, size) stamp
+# Questions are stored by ID; "list" and "sorted" are views rebuilt only after a change
+# "version" is bumped on every change so derived views can tell when they're stale
+# "pending" holds journal entries not yet written, "journal_entries" counts those on
+# disk, "rewrite" asks for a full save, and "writing" is set while a flush is on disk
+_QUESTIONS_CACHE = {
+    "stamp": None, "loaded": False, "by_id": {}, "list": None, "sorted": None,
+    "sorted_ids": None, "categories": None, "category_markup": None, "by_category": None,
+    "records": {}, "summaries": {}, "max_id": 0, "reserved_id": 0, "dirty": False,
+    "writing": False, "version": 0, "pending": [], "journal_entries": 0, "rewrite": False
+}
+_USERS_CACHE = {"stamp": None, "data": None, "dirty": False, "writing": False}
+
+# Read-only snapshot of a question used while a quiz is running, with the
+# correct option's text and the option count worked out once
+Question = namedtuple('Question', 'id question options answer answer_text option_count')
+
+# Guard the cache state shared with worker threads; flushes never hold these
+# across the disk write itself, so the event loop can't stall behind an fsync.
+# Reentrant because a first load may save the sample data while holding them
+_QUESTIONS_IO_LOCK = threading.RLock()
+_USERS_IO_LOCK = threading.RLock()
+# Serialize the flushes themselves
+_QUESTIONS_WRITE_LOCK = threading.Lock()
+_USERS_WRITE_LOCK = threading.Lock()
+
+def _file_stamp(stat):
+    """Return the part of a stat result that tells us a file has changed"""
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _questions_stamp():
+    """Return the combined stamp of the questions file and its journal"""
+    stamps = []
+    for path in (QUESTIONS_FILE, QUESTIONS_JOURNAL):
+        try:
+            stamps.append(_file_stamp(os.stat(path)))
+        except FileNotFoundError:
+            stamps.append(None)
+    return tuple(stamps)
+
+def _load_json(raw):
+    """Parse UTF-8 JSON bytes"""
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _dump_json(data):
+    """Serialize data to compact UTF-8 JSON bytes"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _atomic_write(path, data):
+    """Replace path with data so readers never see a partially written file"""
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+
+def _log_json(data):
+    """Render arbitrary state as JSON text for log messages"""
+    if orjson:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, default=str)
+
+def _set_questions_cache(questions):
+    """Replace the cached questions with the given list, indexed by ID"""
+    _QUESTIONS_CACHE["by_id"] = {q.get("id"): q for q in questions}
+    _clear_question_views()
+    _QUESTIONS_CACHE["max_id"] = max((q.get("id") or 0 for q in questions), default=0)
+    _QUESTIONS_CACHE["loaded"] = True
+    _QUESTIONS_CACHE["version"] += 1
+
+def _questions_cache():
+    """Return the questions cache, loading it from disk the first time"""
+    # Once loaded, skip the lock and the stat; aload_questions picks up outside edits
+    if _QUESTIONS_CACHE["loaded"]:
+        return _QUESTIONS_CACHE
+    load_questions()
+    if not _QUESTIONS_CACHE["loaded"]:
+        _set_questions_cache([])
+    return _QUESTIONS_CACHE
+
+def _questions_view():
+    """Return the cached questions as a list, building it only after a change"""
+    if _QUESTIONS_CACHE["list"] is None:
+        _QUESTIONS_CACHE["list"] = list(_QUESTIONS_CACHE["by_id"].values())
+    return _QUESTIONS_CACHE["list"]
+
+def questions_list():
+    """Return all questions as a list"""
+    _questions_cache()
+    return _questions_view()
+
+def questions_sorted_by_id():
+    """Return all questions sorted by ID, along with the matching list of IDs"""
+    cache = _questions_cache()
+    if cache["sorted"] is None:
+        cache["sorted"] = sorted(cache["by_id"].values(), key=lambda q: q.get('id') or 0)
+        cache["sorted_ids"] = [q.get('id') or 0 for q in cache["sorted"]]
+    return cache["sorted"], cache["sorted_ids"]
+
+def smallest_question_ids(n):
+    """Return the n lowest question IDs without sorting every question"""
+    cache = _questions_cache()
+    if cache["sorted"] is not None:
+        return [q.get('id') for q in cache["sorted"][:n]]
+    return heapq.nsmallest(n, cache["by_id"], key=lambda question_id: question_id or 0)
+
+def question_categories():
+    """Return the sorted tuple of distinct question categories"""
+    _questions_cache()
+    if _QUESTIONS_CACHE["categories"] is None:
+        _QUESTIONS_CACHE["categories"] = tuple(sorted(
+            {q.get("category", "Unknown") for q in _QUESTIONS_CACHE["by_id"].values()}
+        ))
+    return _QUESTIONS_CACHE["categories"]
+
+def questions_in_category(category):
+    """Return the questions in a category, grouping them once per change"""
+    _questions_cache()
+    if _QUESTIONS_CACHE["by_category"] is None:
+        by_category = {}
+        for q in _QUESTIONS_CACHE["by_id"].values():
+            by_category.setdefault(q.get("category", "Unknown"), []).append(q)
+        _QUESTIONS_CACHE["by_category"] = by_category
+    return _QUESTIONS_CACHE["by_category"].get(category, [])
+
+def category_quiz_markup():
+    """Return the /category keyboard, two categories per row"""
+    categories = question_categories()
+    if _QUESTIONS_CACHE["category_markup"] is None:
+        _QUESTIONS_CACHE["category_markup"] = InlineKeyboardMarkup([
+            [InlineKeyboardButton(cat, callback_data=f"cat_{cat}") for cat in categories[i:i + 2]]
+            for i in range(0, len(categories), 2)
+        ])
+    return _QUESTIONS_CACHE["category_markup"]
+
+def question_record(question):
+    """Return the Question snapshot for a stored question dict, building it once"""
+    records = _QUESTIONS_CACHE["records"]
+    record = records.get(question.get('id'))
+    if record is None:
+        options = question.get('options', [])
+        answer = question.get('answer', 0)
+        record = Question(
+            question.get('id'),
+            question.get('question', 'Unknown Question'),
+            options,
+            answer,
+            options[answer] if 0 <= answer < len(options) else '',
+            len(options)
+        )
+        records[record.id] = record
+    return record
+
+def question_summary(question):
+    """Return the short one-line preview of a question used in listings"""
+    summaries = _QUESTIONS_CACHE["summaries"]
+    summary = summaries.get(question.get('id'))
+    if summary is None:
+        text = question.get('question') or ''
+        summary = text[:30] + ('...' if len(text) > 30 else '')
+        summaries[question.get('id')] = summary
+    return summary
+
+def _clear_question_views():
+    """Drop the derived question lists so they are rebuilt on next use"""
+    _QUESTIONS_CACHE["list"] = None
+    _QUESTIONS_CACHE["sorted"] = None
+    _QUESTIONS_CACHE["sorted_ids"] = None
+    _QUESTIONS_CACHE["categories"] = None
+    _QUESTIONS_CACHE["category_markup"] = None
+    _QUESTIONS_CACHE["by_category"] = None
+    _QUESTIONS_CACHE["records"] = {}
+    _QUESTIONS_CACHE["summaries"] = {}
+
+def _questions_changed(entry=None):
+    """Mark the cached questions as modified so the next flush writes them
+    
+    entry is the journal record for a single-question change; without one
+    the next flush rewrites the whole file.
+    """
+    # Held so a flush can't swap out "pending" between the append and the dirty mark
+    with _QUESTIONS_IO_LOCK:
+        if entry is None:
+            _QUESTIONS_CACHE["rewrite"] = True
+        else:
+            _QUESTIONS_CACHE["pending"].append(entry)
+        _QUESTIONS_CACHE["dirty"] = True
+    _clear_question_views()
+    _QUESTIONS_CACHE["version"] += 1
+    _schedule_flush()
+
 def load_questions():
     """Load questions from the JSON file"""
+    with _QUESTIONS_IO_LOCK:
+        return _load_questions()
+
+async def aload_questions():
+    """Load questions without blocking the event loop on disk reads"""
+    # Serve the in-memory copy directly while it is current; only a stat is needed
+    if _QUESTIONS_CACHE["loaded"] and (
+        _QUESTIONS_CACHE["dirty"] or _QUESTIONS_CACHE["writing"]
+        or _questions_stamp() == _QUESTIONS_CACHE["stamp"]
+    ):
+        return _questions_view()
+    return await _run_io(load_questions)
+
+def _load_questions():
+    """Return the cached questions, re-reading the file if it changed"""
+    # Unsaved or half-written changes in memory always win over the file on disk
+    if _QUESTIONS_CACHE["dirty"] or _QUESTIONS_CACHE["writing"]:
+        return _questions_view()
+    
     try:
         if os.path.exists(QUESTIONS_FILE):
-            with open(QUESTIONS_FILE, 'r', encoding='utf-8') as file:
-                questions = json.load(file)
-            logger.info(f"Loaded {len(questions)} questions")
-            return questions
+            stamp = _questions_stamp()
+            if stamp == _QUESTIONS_CACHE["stamp"]:
+                return _questions_view()
+            
+            with open(QUESTIONS_FILE, 'rb') as file:
+                questions = _load_json(file.read())
+            _set_questions_cache(questions)
+            
+            # Replay changes made since the file was last rewritten
+            journal_entries = 0
+            if stamp[1] is not None:
+                by_id = _QUESTIONS_CACHE["by_id"]
+                with open(QUESTIONS_JOURNAL, 'rb') as file:
+                    for line in file:
+                        if not line.strip():
+                            continue
+                        entry = _load_json(line)
+                        if "put" in entry:
+                            by_id[entry["put"].get("id")] = entry["put"]
+                        else:
+                            by_id.pop(entry["del"], None)
+                        journal_entries += 1
+                _set_questions_cache(list(by_id.values()))
+            _QUESTIONS_CACHE["journal_entries"] = journal_entries
+            
+            _QUESTIONS_CACHE["stamp"] = stamp
+            logger.info(f"Loaded {len(_QUESTIONS_CACHE['by_id'])} questions")
+            return _questions_view()
         else:
             # Create sample questions if file doesn't exist
             questions = [
@@ -64,53 +459,255 @@ def load_questions():
                 }
             ]
             save_questions(questions)
-            return questions
+            return _questions_view()
     except Exception as e:
         logger.error(f"Error loading questions: {e}")
         return []
 
 def save_questions(questions):
-    """Save questions to the JSON file"""
+    """Update the cached questions; they are written to disk by flush_questions()"""
+    _set_questions_cache(questions)
+    _questions_changed()
+    return True
+
+def flush_questions(compact=False):
+    """Write pending question changes to disk
+    
+    Single-question changes are appended to the journal; bulk changes, or
+    compact=True, rewrite the whole JSON file and clear the journal.
+    """
+    with _QUESTIONS_WRITE_LOCK:
+        # Snapshot under the lock, which every change also takes; changes made
+        # while the file is written mark it dirty again
+        with _QUESTIONS_IO_LOCK:
+            if compact and os.path.exists(QUESTIONS_JOURNAL):
+                _QUESTIONS_CACHE["rewrite"] = True
+                _QUESTIONS_CACHE["dirty"] = True
+            if not _QUESTIONS_CACHE["dirty"]:
+                return True
+            _QUESTIONS_CACHE["dirty"] = False
+            
+            pending = _QUESTIONS_CACHE["pending"]
+            rewrite = _QUESTIONS_CACHE["rewrite"] or (
+                _QUESTIONS_CACHE["journal_entries"] + len(pending) > JOURNAL_COMPACT_ENTRIES
+            )
+            _QUESTIONS_CACHE["pending"] = []
+            if rewrite:
+                questions = _questions_view()
+                data = _dump_json(questions)
+            else:
+                data = b''.join(_dump_json(entry) + b'\n' for entry in pending)
+            _QUESTIONS_CACHE["rewrite"] = False
+            _QUESTIONS_CACHE["writing"] = True
+        
+        try:
+            if rewrite:
+                # Write to a temporary file first so a crash can't truncate the real one
+                _atomic_write(QUESTIONS_FILE, data)
+                if os.path.exists(QUESTIONS_JOURNAL):
+                    os.remove(QUESTIONS_JOURNAL)
+                logger.info(f"Saved {len(questions)} questions")
+            else:
+                with open(QUESTIONS_JOURNAL, 'ab') as file:
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                logger.info(f"Saved {len(pending)} question changes")
+            stamp = _questions_stamp()
+            
+            with _QUESTIONS_IO_LOCK:
+                if rewrite:
+                    _QUESTIONS_CACHE["journal_entries"] = 0
+                else:
+                    _QUESTIONS_CACHE["journal_entries"] += len(pending)
+                _QUESTIONS_CACHE["stamp"] = stamp
+                _QUESTIONS_CACHE["writing"] = False
+            return True
+        except Exception as e:
+            # Fall back to a full rewrite so nothing written so far is lost
+            with _QUESTIONS_IO_LOCK:
+                _QUESTIONS_CACHE["rewrite"] = True
+                _QUESTIONS_CACHE["dirty"] = True
+                _QUESTIONS_CACHE["writing"] = False
+            logger.error(f"Error saving questions: {e}")
+            return False
+
+# Don't lose pending changes if the process exits between flushes; compaction
+# happens once in post_shutdown, so this only writes what is still pending
+atexit.register(flush_questions)
+
+def _schedule_flush():
+    """Write pending changes after FLUSH_DELAY unless a flush is already scheduled"""
+    global _FLUSH_TASK
     try:
-        with open(QUESTIONS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(questions, file, ensure_ascii=False, indent=4)
-        logger.info(f"Saved {len(questions)} questions")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving questions: {e}")
-        return False
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop in this thread; the next scheduled flush or exit will write it
+        return
+    # A steady stream of edits shouldn't keep pushing the write back
+    if _FLUSH_TASK is not None and not _FLUSH_TASK.done():
+        return
+    _FLUSH_TASK = loop.create_task(_delayed_flush())
+
+async def _delayed_flush():
+    """Wait out the debounce delay, then write pending question and user changes"""
+    while True:
+        await asyncio.sleep(FLUSH_DELAY)
+        questions_saved = await _run_io(flush_questions)
+        users_saved = await _run_io(flush_users)
+        
+        # Changes made while writing get another round; failed writes wait for the next change
+        if not (questions_saved and users_saved):
+            return
+        if not (_QUESTIONS_CACHE["dirty"] or _USERS_CACHE["dirty"]):
+            return
+
+def store_question(question):
+    """Add a question to the cache, replacing any question with the same ID"""
+    cache = _questions_cache()
+    cache["by_id"][question.get("id")] = question
+    cache["max_id"] = max(cache["max_id"], question.get("id") or 0)
+    _questions_changed({"put": question})
+    return True
+
+# Number of questions shown per page in the /edit list
+EDIT_PAGE_SIZE = 5
+
+def get_edit_pages(context):
+    """Return the formatted /edit list pages, rebuilding them only when questions change"""
+    sorted_questions, _ = questions_sorted_by_id()
+    version = _QUESTIONS_CACHE["version"]
+    pages = context.user_data.get('edit_pages')
+    if pages is not None and context.user_data.get('edit_pages_version') == version:
+        return pages
+    
+    total = len(sorted_questions)
+    pages = []
+    for start_idx in range(0, total, EDIT_PAGE_SIZE):
+        end_idx = min(start_idx + EDIT_PAGE_SIZE, total)
+        parts = ["Select a question to edit by entering its ID:", ""]
+        parts.extend(f"ID {q.get('id')}: {question_summary(q)}" for q in sorted_questions[start_idx:end_idx])
+        
+        # Add navigation info
+        parts += ["", f"Showing questions {start_idx + 1}-{end_idx} of {total}"]
+        parts.append("To see more questions, reply with 'next'" if total > EDIT_PAGE_SIZE else "")
+        pages.append("\n".join(parts))
+    
+    context.user_data['edit_pages'] = pages
+    context.user_data['edit_pages_version'] = version
+    return pages
 
 def get_next_question_id():
-    """Get the next available question ID"""
-    questions = load_questions()
-    if not questions:
-        return 1
-    return max(q.get("id", 0) for q in questions) + 1
+    """Get the next available question ID, reserving it for the caller
+    
+    IDs handed out before their question is stored are not reused, so two
+    users adding questions at once don't end up with the same ID.
+    """
+    cache = _questions_cache()
+    next_id = max(cache["max_id"], cache["reserved_id"]) + 1
+    cache["reserved_id"] = next_id
+    return next_id
 
 def get_question_by_id(question_id):
     """Get a question by its ID"""
-    questions = load_questions()
-    for question in questions:
-        if question.get("id") == question_id:
-            return question
-    return None
+    return _questions_cache()["by_id"].get(question_id)
 
 def delete_question_by_id(question_id):
     """Delete a question by its ID"""
-    questions = load_questions()
-    updated_questions = [q for q in questions if q.get("id") != question_id]
-    if len(updated_questions) < len(questions):
-        save_questions(updated_questions)
-        return True
-    return False
-
-def parse_telegram_quiz_url(url):
+    cache = _questions_cache()
+    if cache["by_id"].pop(question_id, None) is None:
+        return False
+    _questions_changed({"del": question_id})
+    return True
+
+async def get_pyrogram_client(api_id, api_hash, bot_token):
+    """Return a started Pyrogram client, creating it on first use"""
+    global _PYROGRAM_CLIENT
+    async with _PYROGRAM_LOCK:
+        if _PYROGRAM_CLIENT is None:
+            client = Client(
+                "quiz_bot_client",
+                api_id=api_id,
+                api_hash=api_hash,
+                bot_token=bot_token,
+                in_memory=True,
+                # Only used to read messages; PTB owns this bot's updates
+                no_updates=True
+            )
+            await client.start()
+            _PYROGRAM_CLIENT = client
+    return _PYROGRAM_CLIENT
+
+def extract_quiz_from_page(soup):
+    """Extract a quiz from the message text of a parsed t.me page"""
+    # Look for message text that might contain quiz
+    message_text = soup.select_one('.tgme_widget_message_text')
+    if message_text:
+        text = message_text.get_text().strip()
+        lines = [line for line in (raw.strip() for raw in text.splitlines()) if line]
+        
+        if lines and len(lines) >= 3:  # At least question + 2 options
+            question = lines[0]
+            
+            # Check if this looks like a quiz (has options with A), B), 1., 2., etc.)
+            options = []
+            for line in lines[1:]:
+                # Remove option markers
+                clean_line = _OPT_PREFIX.sub('', line, count=1)
+                if clean_line:
+                    options.append(clean_line)
+            
+            if len(options) >= 2:
+                logger.info(f"Extracted quiz from message text with {len(options)} options")
+                return {
+                    "question": question,
+                    "options": options,
+                    "answer": 0
+                }
+    
+    # For RAJ GK QUIZ HOUSE format, look for quiz title
+    page_title = soup.select_one('meta[property="og:title"]')
+    if page_title and "quiz" in page_title.get('content', '').lower():
+        title = page_title.get('content', '').strip()
+        
+        # Try to extract options from the page
+        lines = []
+        for p in soup.select('.tgme_widget_message_text p'):
+            lines.append(p.get_text().strip())
+        
+        # If we have potential options
+        if lines and len(lines) >= 2:
+            return {
+                "question": title,
+                "options": lines,
+                "answer": 0
+            }
+    
+    return None
+
+def parse_message_link(url):
+    """Split a t.me message link into (channel_name, message_id), or None if it isn't one"""
+    if not url:
+        return None
+    if '://' not in url:
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    if parsed.netloc.lower() not in TELEGRAM_HOSTS:
+        return None
+    parts = parsed.path.strip('/').split('/')
+    if len(parts) < 2 or not parts[1].isdigit():
+        return None
+    return parts[0], int(parts[1])
+
+async def parse_telegram_quiz_url(url):
     """Parse a Telegram quiz URL to extract question and options"""
     try:
-        # Basic URL validation
-        if not url or "t.me" not in url:
+        # Validate the URL and pull out the channel and message ID in one pass
+        link = parse_message_link(url)
+        if not link:
             logger.error(f"Not a valid Telegram URL: {url}")
             return None
+        channel_name, message_id = link
         
         # Try different methods to extract quiz content
         logger.info(f"Attempting to extract quiz from URL: {url}")
@@ -120,166 +717,89 @@ def parse_telegram_quiz_url(url):
         api_hash = os.getenv('API_HASH')
         bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         
-        if api_id and api_hash and bot_token:
+        if Client and api_id and api_hash and bot_token:
             try:
-                from pyrogram import Client
-                import asyncio
+                logger.info(f"Trying to fetch message from {channel_name}, ID: {message_id}")
+                app = await get_pyrogram_client(api_id, api_hash, bot_token)
+                message = await app.get_messages(channel_name, message_id)
+                result = None
                 
-                # Extract channel username and message ID from URL
-                channel_pattern = r't\.me/([^/]+)/(\d+)'
-                channel_match = re.search(channel_pattern, url)
+                if message:
+                    # If it's a poll message
+                    if message.poll:
+                        result = {
+                            "question": message.poll.question,
+                            "options": [opt.text for opt in message.poll.options],
+                            "answer": 0  # Default, user will select correct answer
+                        }
+                    # If it's a text message that might contain quiz info
+                    elif message.text:
+                        # Try to parse text as quiz (question + options format)
+                        lines = [line for line in (raw.strip() for raw in message.text.splitlines()) if line]
+                        if len(lines) >= 3:  # At least 1 question and 2 options
+                            question = lines[0]
+                            options = []
+                            
+                            # Extract options (look for numbered/lettered options)
+                            for line in lines[1:]:
+                                # Remove common option prefixes
+                                line = _OPT_PREFIX.sub('', line, count=1)
+                                if line:
+                                    options.append(line)
+                            
+                            if len(options) >= 2:
+                                result = {
+                                    "question": question,
+                                    "options": options,
+                                    "answer": 0
+                                }
                 
-                if channel_match:
-                    channel_name = channel_match.group(1)
-                    message_id = int(channel_match.group(2))
-                    
-                    # Function to get message using Pyrogram
-                    async def get_quiz_message():
-                        logger.info(f"Trying to fetch message from {channel_name}, ID: {message_id}")
-                        async with Client(
-                            "quiz_bot_client",
-                            api_id=api_id,
-                            api_hash=api_hash,
-                            bot_token=bot_token,
-                            in_memory=True
-                        ) as app:
-                            try:
-                                message = await app.get_messages(channel_name, message_id)
-                                if message:
-                                    # If it's a poll message
-                                    if message.poll:
-                                        return {
-                                            "question": message.poll.question,
-                                            "options": [opt.text for opt in message.poll.options],
-                                            "answer": 0  # Default, user will select correct answer
-                                        }
-                                    # If it's a text message that might contain quiz info
-                                    elif message.text:
-                                        # Try to parse text as quiz (question + options format)
-                                        lines = message.text.strip().split('\n')
-                                        if len(lines) >= 3:  # At least 1 question and 2 options
-                                            question = lines[0]
-                                            options = []
-                                            
-                                            # Extract options (look for numbered/lettered options)
-                                            for line in lines[1:]:
-                                                line = line.strip()
-                                                # Remove common option prefixes
-                                                line = re.sub(r'^[a-z][\.\)]\s*', '', line)
-                                                line = re.sub(r'^\d+[\.\)]\s*', '', line)
-                                                if line:
-                                                    options.append(line)
-                                            
-                                            if len(options) >= 2:
-                                                return {
-                                                    "question": question,
-                                                    "options": options,
-                                                    "answer": 0
-                                                }
-                            except Exception as e:
-                                logger.error(f"Error getting message with Pyrogram: {e}")
-                                return None
-                        return None
-                    
-                    # Run the async function
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    result = loop.run_until_complete(get_quiz_message())
-                    loop.close()
-                    
-                    if result:
-                        logger.info(f"Successfully extracted quiz via Pyrogram: {result['question']}")
-                        return result
+                if result:
+                    logger.info(f"Successfully extracted quiz via Pyrogram: {result['question']}")
+                    return result
             except Exception as e:
                 logger.error(f"Pyrogram method failed: {e}")
         
         # Method 2: Enhanced web scraping with multiple patterns
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
-        
         # Try to get both the regular URL and the embedded version
         try:
-            response = requests.get(url, headers=headers)
-            content = response.text
+            response = await _HTTPX.get(url)
+            content = response.text[:MAX_PAGE_SIZE]
+            soup = BeautifulSoup(content, 'lxml')
             
             # First, look for standard poll format
-            poll_q_match = re.search(r'<div class="tgme_widget_message_poll_question">([^<]+)</div>', content)
-            poll_options = re.findall(r'<div class="tgme_widget_message_poll_option_text">([^<]+)</div>', content)
+            poll_question = soup.select_one('.tgme_widget_message_poll_question')
+            poll_options = [
+                option.get_text().strip()
+                for option in soup.select('.tgme_widget_message_poll_option_text')
+            ]
             
-            if poll_q_match and poll_options and len(poll_options) >= 2:
-                question = poll_q_match.group(1).strip()
+            if poll_question and len(poll_options) >= 2:
+                question = poll_question.get_text().strip()
                 return {
                     "question": question,
                     "options": poll_options,
                     "answer": 0
                 }
             
-            # If not a direct poll, try embedded view
+            # If not a direct poll, look for a quiz written out in the message text
             if "rajsthangk" in url or "gk" in url.lower() or "quiz" in url.lower():
-                # Try to extract channel and message_id
-                channel_pattern = r't\.me/([^/]+)/(\d+)'
-                channel_match = re.search(channel_pattern, url)
+                result = extract_quiz_from_page(soup)
+                if result:
+                    return result
                 
-                if channel_match:
-                    channel_name = channel_match.group(1)
-                    message_id = channel_match.group(2)
+                # Only fetch the embedded view if the page itself had nothing
+                embed_url = f"https://t.me/{channel_name}/{message_id}?embed=1"
+                try:
+                    embed_response = await _HTTPX.get(embed_url)
+                    embed_content = embed_response.text[:MAX_PAGE_SIZE]
                     
-                    # Try embedded view
-                    embed_url = f"https://t.me/{channel_name}/{message_id}?embed=1"
-                    try:
-                        embed_response = requests.get(embed_url, headers=headers)
-                        embed_content = embed_response.text
-                        
-                        # Try to find quiz in embedded view
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(embed_content, 'html.parser')
-                        
-                        # Look for message text that might contain quiz
-                        message_text = soup.select_one('.tgme_widget_message_text')
-                        if message_text:
-                            text = message_text.get_text().strip()
-                            lines = [line.strip() for line in text.split('\n') if line.strip()]
-                            
-                            if lines and len(lines) >= 3:  # At least question + 2 options
-                                question = lines[0]
-                                
-                                # Check if this looks like a quiz (has options with A), B), 1., 2., etc.)
-                                option_pattern = re.compile(r'^[A-Za-z0-9][\.\)]')
-                                options = []
-                                for line in lines[1:]:
-                                    # Remove option markers
-                                    clean_line = re.sub(r'^[A-Za-z0-9][\.\)]\s*', '', line)
-                                    if clean_line:
-                                        options.append(clean_line)
-                                
-                                if len(options) >= 2:
-                                    logger.info(f"Extracted quiz from message text with {len(options)} options")
-                                    return {
-                                        "question": question,
-                                        "options": options,
-                                        "answer": 0
-                                    }
-                        
-                        # For RAJ GK QUIZ HOUSE format, look for quiz title
-                        page_title = soup.select_one('meta[property="og:title"]')
-                        if page_title and "quiz" in page_title.get('content', '').lower():
-                            title = page_title.get('content', '').strip()
-                            
-                            # Try to extract options from the page
-                            lines = []
-                            for p in soup.select('.tgme_widget_message_text p'):
-                                lines.append(p.get_text().strip())
-                            
-                            # If we have potential options
-                            if lines and len(lines) >= 2:
-                                return {
-                                    "question": title,
-                                    "options": lines,
-                                    "answer": 0
-                                }
-                    except Exception as e:
-                        logger.error(f"Error parsing embedded view: {e}")
+                    # Try to find quiz in embedded view
+                    result = extract_quiz_from_page(BeautifulSoup(embed_content, 'lxml'))
+                    if result:
+                        return result
+                except Exception as e:
+                    logger.error(f"Error parsing embedded view: {e}")
         except Exception as e:
             logger.error(f"Error requesting URL: {e}")
         
@@ -291,41 +811,110 @@ def parse_telegram_quiz_url(url):
 
 def load_users():
     """Load user data from file"""
+    with _USERS_IO_LOCK:
+        return _load_users()
+
+def _users_data():
+    """Return the cached user data, loading it from disk the first time"""
+    # Once loaded, skip the lock and the stat; aload_users picks up outside edits
+    if _USERS_CACHE["data"] is not None:
+        return _USERS_CACHE["data"]
+    return load_users()
+
+def _load_users():
+    """Return the cached user data, re-reading the file if it changed"""
+    # Unsaved or half-written changes in memory always win over the file on disk
+    if _USERS_CACHE["dirty"] or _USERS_CACHE["writing"]:
+        return _USERS_CACHE["data"]
+    
     try:
         if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r', encoding='utf-8') as file:
-                users = json.load(file)
+            stat = os.stat(USERS_FILE)
+            if _file_stamp(stat) == _USERS_CACHE["stamp"]:
+                return _USERS_CACHE["data"]
+            
+            with open(USERS_FILE, 'rb') as file:
+                users = _load_json(file.read())
+            _USERS_CACHE["stamp"] = _file_stamp(stat)
+            _USERS_CACHE["data"] = users
             logger.info(f"Loaded data for {len(users)} users")
             return users
         else:
             # Create empty users file if it doesn't exist
-            save_users({})
-            return {}
+            users = {}
+            save_users(users)
+            return users
     except Exception as e:
         logger.error(f"Error loading users: {e}")
-        return {}
+        # Keep the fallback cached so updates to it aren't thrown away
+        if _USERS_CACHE["data"] is None:
+            _USERS_CACHE["data"] = {}
+        return _USERS_CACHE["data"]
+
+async def aload_users():
+    """Load user data without blocking the event loop on disk reads"""
+    return await _run_io(load_users)
 
 def save_users(users):
-    """Save user data to file"""
-    try:
-        with open(USERS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(users, file, ensure_ascii=False, indent=4)
-        logger.info(f"Saved data for {len(users)} users")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving users: {e}")
-        return False
+    """Update the cached user data; it is written to disk by flush_users()"""
+    with _USERS_IO_LOCK:
+        _USERS_CACHE["data"] = users
+        _USERS_CACHE["dirty"] = True
+    _schedule_flush()
+    return True
+
+def flush_users():
+    """Write pending user data changes to the JSON file"""
+    with _USERS_WRITE_LOCK:
+        # Snapshot under the lock, which every change also takes, then write without it
+        with _USERS_IO_LOCK:
+            if not _USERS_CACHE["dirty"] or _USERS_CACHE["data"] is None:
+                return True
+            _USERS_CACHE["dirty"] = False
+            
+            users = _USERS_CACHE["data"]
+            data = _dump_json(users)
+            _USERS_CACHE["writing"] = True
+        
+        try:
+            _atomic_write(USERS_FILE, data)
+            stamp = _file_stamp(os.stat(USERS_FILE))
+            with _USERS_IO_LOCK:
+                _USERS_CACHE["stamp"] = stamp
+                _USERS_CACHE["writing"] = False
+            logger.info(f"Saved data for {len(users)} users")
+            return True
+        except Exception as e:
+            with _USERS_IO_LOCK:
+                _USERS_CACHE["dirty"] = True
+                _USERS_CACHE["writing"] = False
+            logger.error(f"Error saving users: {e}")
+            return False
+
+atexit.register(flush_users)
 
 def get_user_data(user_id):
     """Get data for a specific user"""
-    users = load_users()
+    users = _users_data()
     return users.get(str(user_id), {})
 
 def update_user_data(user_id, data):
     """Update data for a specific user"""
-    users = load_users()
-    users[str(user_id)] = data
-    save_users(users)
+    users = _users_data()
+    with _USERS_IO_LOCK:
+        users[str(user_id)] = data
+        _USERS_CACHE["dirty"] = True
+    _schedule_flush()
+
+def bulk_increment_quizzes_taken(user_ids):
+    """Count a finished quiz for each of the given users with a single update"""
+    users = _users_data()
+    with _USERS_IO_LOCK:
+        for user_id in user_ids:
+            user_data = users.setdefault(str(user_id), {})
+            user_data['quizzes_taken'] = user_data.get('quizzes_taken', 0) + 1
+        _USERS_CACHE["dirty"] = True
+    _schedule_flush()
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Start command handler"""
@@ -375,7 +964,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Display user statistics"""
     user_id = update.effective_user.id
-    user_data = get_user_data(user_id)
+    users = await aload_users()
+    user_data = users.get(str(user_id), {})
     
     total_answers = user_data.get('total_answers', 0)
     correct_answers = user_data.get('correct_answers', 0)
@@ -433,7 +1023,7 @@ async def add_question_text(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def add_question_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle options input"""
     options_text = update.message.text.strip()
-    options = [line.strip() for line in options_text.split('\n') if line.strip()]
+    options = [line for line in (raw.strip() for raw in options_text.splitlines()) if line]
     
     if len(options) < 2:
         await update.message.reply_text(
@@ -466,30 +1056,15 @@ async def add_question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Get the next available question ID
         question_id = get_next_question_id()
         
-        # Show category selection
-        keyboard = [
-            ["Geography", "Science", "History"],
-            ["Literature", "Sports", "Entertainment"],
-            ["General Knowledge", "Other"]
-        ]
-        
-        # Flatten the keyboard for easier category extraction
-        all_categories = [cat for row in keyboard for cat in row]
-        
-        # Create inline keyboard with category buttons
-        reply_markup = InlineKeyboardMarkup([
-            [InlineKeyboardButton(cat, callback_data=f"category_{cat}") for cat in row]
-            for row in keyboard
-        ])
-        
         # Store the current information
         context.user_data['new_question_answer'] = answer_index
         context.user_data['new_question_id'] = question_id
-        context.user_data['all_categories'] = all_categories
+        context.user_data['all_categories'] = list(ALL_CATEGORIES)
         
+        # Show category selection
         await update.message.reply_text(
             "Almost done! Please select a category for this question:",
-            reply_markup=reply_markup
+            reply_markup=ADD_CAT_MARKUP
         )
         
         return ConversationHandler.END
@@ -500,8 +1075,8 @@ async def add_question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ANSWER
 
-async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle category selection callback"""
+async def add_question_category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle category selection callback for a newly added question"""
     query = update.callback_query
     await query.answer()
     
@@ -509,18 +1084,17 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
         category = query.data.replace("category_", "")
         
         # Create the new question with all collected data
+        user_data = context.user_data
         question_data = {
-            "id": context.user_data.get('new_question_id'),
-            "question": context.user_data.get('new_question_text'),
-            "options": context.user_data.get('new_question_options'),
-            "answer": context.user_data.get('new_question_answer'),
+            "id": user_data.pop('new_question_id', None),
+            "question": user_data.pop('new_question_text', None),
+            "options": user_data.pop('new_question_options', None),
+            "answer": user_data.pop('new_question_answer', None),
             "category": category
         }
         
-        # Load existing questions, add the new one, and save
-        questions = load_questions()
-        questions.append(question_data)
-        success = save_questions(questions)
+        # Add the new question to the cached list; it is written on the next flush
+        success = store_question(question_data)
         
         if success:
             await query.edit_message_text(
@@ -542,6 +1116,29 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     )
     return ConversationHandler.END
 
+def _render_edit_prompt(question_id, question):
+    """Build the message showing a question's details and the edit menu"""
+    parts = [
+        f"Editing Question #{question_id}:",
+        "",
+        f"Question: {question.get('question')}",
+        "",
+        "Options:",
+    ]
+    parts.extend(f"{i}. {opt}" for i, opt in enumerate(question.get('options', []), 1))
+    parts += [
+        "",
+        f"Correct Answer: {question.get('answer', 0) + 1}",  # 1-based for display
+        f"Category: {question.get('category', 'Uncategorized')}",
+        "",
+        "What would you like to edit?",
+        "1. Question text",
+        "2. Options",
+        "3. Correct answer",
+        "Enter a number (1-3):",
+    ]
+    return "\n".join(parts)
+
 async def edit_question_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the process of editing a question"""
     # Check if an ID was provided with the command
@@ -555,21 +1152,7 @@ async def edit_question_start(update: Update, context: ContextTypes.DEFAULT_TYPE
             context.user_data['edit_question_id'] = question_id
             
             # Show the question details and ask what to edit
-            options_text = "\n".join([f"{i+1}. {opt}" for i, opt in enumerate(question.get('options', []))])
-            correct_index = question.get('answer', 0) + 1  # Convert to 1-based for display
-            
-            await update.message.reply_text(
-                f"Editing Question #{question_id}:\n\n"
-                f"Question: {question.get('question')}\n\n"
-                f"Options:\n{options_text}\n\n"
-                f"Correct Answer: {correct_index}\n"
-                f"Category: {question.get('category', 'Uncategorized')}\n\n"
-                f"What would you like to edit?\n"
-                f"1. Question text\n"
-                f"2. Options\n"
-                f"3. Correct answer\n"
-                f"Enter a number (1-3):"
-            )
+            await update.message.reply_text(_render_edit_prompt(question_id, question))
             return EDIT_QUESTION
         else:
             await update.message.reply_text(
@@ -578,39 +1161,18 @@ async def edit_question_start(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
             return ConversationHandler.END
     
-    # If no ID provided, show a list of questions
-    questions = load_questions()
-    if not questions:
+    # If no ID provided, show a paginated list of questions
+    await aload_questions()
+    pages = get_edit_pages(context)
+    if not pages:
         await update.message.reply_text(
             "There are no questions to edit. Add some using /add command."
         )
         return ConversationHandler.END
     
-    # Show a paginated list of questions
-    page_size = 5
-    context.user_data['edit_page'] = 0
-    context.user_data['edit_page_size'] = page_size
-    
-    # Sort questions by ID
-    sorted_questions = sorted(questions, key=lambda q: q.get('id', 0))
-    context.user_data['all_questions'] = sorted_questions
-    
     # Show first page
-    current_page = 0
-    start_idx = current_page * page_size
-    end_idx = min(start_idx + page_size, len(sorted_questions))
-    
-    message = "Select a question to edit by entering its ID:\n\n"
-    for i in range(start_idx, end_idx):
-        q = sorted_questions[i]
-        message += f"ID {q.get('id')}: {q.get('question')[:30]}{'...' if len(q.get('question', '')) > 30 else ''}\n"
-    
-    # Add navigation info
-    message += f"\nShowing questions {start_idx + 1}-{end_idx} of {len(sorted_questions)}\n"
-    if len(sorted_questions) > page_size:
-        message += "To see more questions, reply with 'next'"
-    
-    await update.message.reply_text(message)
+    context.user_data['edit_page'] = 0
+    await update.message.reply_text(pages[0])
     return EDIT_SELECT
 
 async def edit_question_select(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -619,30 +1181,20 @@ async def edit_question_select(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Handle pagination commands
     if text == 'next':
-        all_questions = context.user_data.get('all_questions', [])
-        page_size = context.user_data.get('edit_page_size', 5)
-        current_page = context.user_data.get('edit_page', 0) + 1
+        pages = get_edit_pages(context)
+        if not pages:
+            await update.message.reply_text(
+                "There are no questions to edit. Add some using /add command."
+            )
+            return ConversationHandler.END
         
-        start_idx = current_page * page_size
-        if start_idx >= len(all_questions):
+        current_page = context.user_data.get('edit_page', 0) + 1
+        if current_page >= len(pages):
             # If we're past the end, go back to the first page
             current_page = 0
-            start_idx = 0
-        
-        end_idx = min(start_idx + page_size, len(all_questions))
-        
-        message = "Select a question to edit by entering its ID:\n\n"
-        for i in range(start_idx, end_idx):
-            q = all_questions[i]
-            message += f"ID {q.get('id')}: {q.get('question')[:30]}{'...' if len(q.get('question', '')) > 30 else ''}\n"
-        
-        # Add navigation info
-        message += f"\nShowing questions {start_idx + 1}-{end_idx} of {len(all_questions)}\n"
-        if len(all_questions) > page_size:
-            message += "To see more questions, reply with 'next'"
         
         context.user_data['edit_page'] = current_page
-        await update.message.reply_text(message)
+        await update.message.reply_text(pages[current_page])
         return EDIT_SELECT
     
     # Try to interpret as a question ID
@@ -655,21 +1207,7 @@ async def edit_question_select(update: Update, context: ContextTypes.DEFAULT_TYP
             context.user_data['edit_question_id'] = question_id
             
             # Show the question details and ask what to edit
-            options_text = "\n".join([f"{i+1}. {opt}" for i, opt in enumerate(question.get('options', []))])
-            correct_index = question.get('answer', 0) + 1  # Convert to 1-based for display
-            
-            await update.message.reply_text(
-                f"Editing Question #{question_id}:\n\n"
-                f"Question: {question.get('question')}\n\n"
-                f"Options:\n{options_text}\n\n"
-                f"Correct Answer: {correct_index}\n"
-                f"Category: {question.get('category', 'Uncategorized')}\n\n"
-                f"What would you like to edit?\n"
-                f"1. Question text\n"
-                f"2. Options\n"
-                f"3. Correct answer\n"
-                f"Enter a number (1-3):"
-            )
+            await update.message.reply_text(_render_edit_prompt(question_id, question))
             return EDIT_QUESTION
         else:
             await update.message.reply_text(
@@ -736,16 +1274,10 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
     """Handle the field update"""
     question_id = context.user_data.get('edit_question_id')
     edit_field = context.user_data.get('edit_field')
-    questions = load_questions()
+    await aload_questions()
+    question = get_question_by_id(question_id)
     
-    # Find the question in the list
-    question_index = -1
-    for i, q in enumerate(questions):
-        if q.get('id') == question_id:
-            question_index = i
-            break
-    
-    if question_index == -1:
+    if question is None:
         await update.message.reply_text(
             "❌ Error: Could not find the question to update."
         )
@@ -754,10 +1286,10 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
     if edit_field == 'question':
         # Update the question text
         new_text = update.message.text.strip()
-        questions[question_index]['question'] = new_text
+        question['question'] = new_text
         
-        # Save the updated questions
-        if save_questions(questions):
+        # Save the updated question
+        if store_question(question):
             await update.message.reply_text(
                 f"✅ Question text updated successfully!\n\n"
                 f"New question: {new_text}"
@@ -770,7 +1302,7 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
     elif edit_field == 'options':
         # Update the options
         options_text = update.message.text.strip()
-        new_options = [line.strip() for line in options_text.split('\n') if line.strip()]
+        new_options = [line for line in (raw.strip() for raw in options_text.splitlines()) if line]
         
         if len(new_options) < 2:
             await update.message.reply_text(
@@ -779,13 +1311,13 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
             return EDIT_OPTIONS
         
         # Update options in the question
-        questions[question_index]['options'] = new_options
+        question['options'] = new_options
         
         # Check if the current answer index is still valid
-        current_answer = questions[question_index].get('answer', 0)
+        current_answer = question.get('answer', 0)
         if current_answer >= len(new_options):
             # Reset to the first option if the current answer is no longer valid
-            questions[question_index]['answer'] = 0
+            question['answer'] = 0
             
             await update.message.reply_text(
                 f"✅ Options updated successfully!\n\n"
@@ -796,13 +1328,13 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
                 f"✅ Options updated successfully!"
             )
         
-        # Save the updated questions
-        save_questions(questions)
+        # Save the updated question
+        store_question(question)
     
     elif edit_field == 'answer':
         try:
             new_answer = int(update.message.text.strip()) - 1  # Convert to 0-based index
-            options = questions[question_index].get('options', [])
+            options = question.get('options', [])
             
             if new_answer < 0 or new_answer >= len(options):
                 await update.message.reply_text(
@@ -811,10 +1343,10 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
                 return EDIT_OPTIONS
             
             # Update the answer in the question
-            questions[question_index]['answer'] = new_answer
+            question['answer'] = new_answer
             
-            # Save the updated questions
-            if save_questions(questions):
+            # Save the updated question
+            if store_question(question):
                 await update.message.reply_text(
                     f"✅ Correct answer updated successfully!\n\n"
                     f"New correct answer: {new_answer + 1}. {options[new_answer]}"
@@ -832,6 +1364,13 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
     
     return ConversationHandler.END
 
+def delete_confirm_markup(question_id):
+    """Build the yes/no keyboard for deleting a question"""
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(DELETE_YES_LABEL, callback_data=f"delete_yes_{question_id}"),
+        InlineKeyboardButton(DELETE_NO_LABEL, callback_data=f"delete_no_{question_id}")
+    ]])
+
 async def delete_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for deleting questions"""
     # Check if an ID was provided with the command
@@ -842,24 +1381,17 @@ async def delete_question(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         
         if question:
             # Ask for confirmation
-            keyboard = [
-                [
-                    InlineKeyboardButton("Yes, delete it", callback_data=f"delete_yes_{question_id}"),
-                    InlineKeyboardButton("No, cancel", callback_data=f"delete_no_{question_id}")
-                ]
-            ]
-            
             await update.message.reply_text(
                 f"Are you sure you want to delete this question?\n\n"
                 f"ID: {question_id}\n"
                 f"Question: {question.get('question')}\n\n"
                 f"This action cannot be undone.",
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                reply_markup=delete_confirm_markup(question_id)
             )
             return
     
     # If no ID provided, show a list of questions
-    questions = load_questions()
+    questions = await aload_questions()
     if not questions:
         await update.message.reply_text(
             "There are no questions to delete. Add some using /add command."
@@ -867,18 +1399,20 @@ async def delete_question(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     # Show a paginated list of questions
-    message = "To delete a question, use /delete [ID]. For example: /delete 5\n\n"
-    message += "Available questions:\n"
+    parts = [
+        "To delete a question, use /delete [ID]. For example: /delete 5",
+        "",
+        "Available questions:",
+    ]
     
-    # Sort and show up to 10 questions
-    sorted_questions = sorted(questions, key=lambda q: q.get('id', 0))
-    for i, q in enumerate(sorted_questions[:10]):
-        message += f"ID {q.get('id')}: {q.get('question')[:30]}{'...' if len(q.get('question', '')) > 30 else ''}\n"
+    # Show up to 10 questions in ID order
+    sorted_questions, _ = questions_sorted_by_id()
+    parts.extend(f"ID {q.get('id')}: {question_summary(q)}" for q in sorted_questions[:10])
     
     if len(sorted_questions) > 10:
-        message += f"\nShowing 10 of {len(sorted_questions)} questions. For more, use /edit to see all questions."
+        parts += ["", f"Showing 10 of {len(sorted_questions)} questions. For more, use /edit to see all questions."]
     
-    await update.message.reply_text(message)
+    await update.message.reply_text("\n".join(parts))
 
 async def delete_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle delete question callback"""
@@ -916,21 +1450,24 @@ async def start_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     # Parse command arguments
     command_args = update.message.text.split()
     for arg in command_args[1:]:
-        if arg.isdigit():
-            # Simple number argument = number of questions
-            num_questions = int(arg)
-        elif arg.startswith("id="):
-            # id=X argument = start with specific question ID
-            try:
-                specific_id = int(arg.split("=")[1])
-            except (ValueError, IndexError):
+        match = _QUIZ_ARG_RE.match(arg)
+        if match is None:
+            if arg.startswith("id="):
                 await update.message.reply_text("Invalid ID format. Using random questions instead.")
-        elif arg.startswith("start="):
-            # start=X argument = start from question ID and continue
-            try:
-                start_id = int(arg.split("=")[1])
-            except (ValueError, IndexError):
+            elif arg.startswith("start="):
                 await update.message.reply_text("Invalid start ID format. Using random questions instead.")
+            continue
+        
+        specific, start, count = match.groups()
+        if specific:
+            # id=X argument = start with specific question ID
+            specific_id = int(specific)
+        elif start:
+            # start=X argument = start from question ID and continue
+            start_id = int(start)
+        else:
+            # Simple number argument = number of questions
+            num_questions = int(count)
     
     # Store the arguments in temporary quiz data
     context.user_data['temp_quiz_data'] = {
@@ -940,13 +1477,7 @@ async def start_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     }
     
     # Ask user to select a timer duration (15 or 30 seconds)
-    keyboard = [
-        [
-            InlineKeyboardButton("15 seconds", callback_data="timer_15"),
-            InlineKeyboardButton("30 seconds", callback_data="timer_30"),
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = TIMER_MARKUP
     
     if specific_id:
         message = f"📊 Starting quiz with question ID #{specific_id}\n\n"
@@ -989,7 +1520,7 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
     category_questions = temp_quiz_data.get('questions', None)
     
     # Load questions
-    questions = load_questions()
+    questions = await aload_questions()
     selected_questions = []
     
     # Case 0: Use pre-selected category questions if available
@@ -1006,11 +1537,7 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
     # Case 1: Start with a specific question ID
     elif specific_id is not None:
         # Find the specific question with this ID
-        target_question = None
-        for q in questions:
-            if q.get('id') == specific_id:
-                target_question = q
-                break
+        target_question = get_question_by_id(specific_id)
         
         if target_question:
             selected_questions = [target_question]
@@ -1028,21 +1555,15 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
                 f"⏱️ Timer: {timer_seconds} seconds"
             )
             # Fall back to random selection
-            selected_questions = random.sample(questions, min(num_questions, len(questions)))
+            selected_questions = _RNG.sample(questions, min(num_questions, len(questions)))
     
     # Case 2: Start from a specific ID and include subsequent questions
     elif start_id is not None:
-        # Sort questions by ID
-        sorted_questions = sorted(questions, key=lambda q: q.get('id', 0))
-        
-        # Find the index of the question with start_id
-        start_index = -1
-        for i, q in enumerate(sorted_questions):
-            if q.get('id') >= start_id:
-                start_index = i
-                break
+        # Find the first question with an ID of at least start_id
+        sorted_questions, sorted_ids = questions_sorted_by_id()
+        start_index = bisect.bisect_left(sorted_ids, start_id)
         
-        if start_index >= 0:
+        if start_index < len(sorted_questions):
             # Select questions starting from start_index
             end_index = min(start_index + num_questions, len(sorted_questions))
             selected_questions = sorted_questions[start_index:end_index]
@@ -1061,12 +1582,12 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
                 f"⏱️ Timer: {timer_seconds} seconds"
             )
             # Fall back to random selection
-            selected_questions = random.sample(questions, min(num_questions, len(questions)))
+            selected_questions = _RNG.sample(questions, min(num_questions, len(questions)))
     
     # Case 3: Default random selection
     else:
         num_questions = min(num_questions, len(questions))
-        selected_questions = random.sample(questions, num_questions)
+        selected_questions = _RNG.sample(questions, num_questions)
         
         # Add stylish confirmation message
         await query.edit_message_text(
@@ -1075,9 +1596,16 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
             f"🏁 Get ready to play!"
         )
     
-    # Store the quiz details in user context
+    # Store the quiz details in user context, closing out any quiz this one replaces
+    previous_quiz = context.user_data.get('quiz')
+    if previous_quiz:
+        _unindex_quiz_polls(context, previous_quiz)
+        _apply_stat_deltas(previous_quiz)
+    records = [question_record(q) for q in selected_questions]
     context.user_data['quiz'] = {
-        'questions': selected_questions,
+        'questions': records,
+        # Correct option per question, looked up by poll_answer on every answer
+        'correct_answers': [q.answer for q in records],
         'current_index': 0,
         'scores': {},
         'participants': {},
@@ -1110,123 +1638,153 @@ async def handle_timer_selection(update: Update, context: ContextTypes.DEFAULT_T
     # Initialize the quiz with proper effective_chat
     await send_next_question(query, context)
 
-async def send_next_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send the next question in the quiz"""
-    # Get the quiz data
-    quiz = context.user_data.get('quiz', {})
-    
-    # Debug: Log the quiz state 
-    logger.info(f"QUIZ STATE in send_next_question: {quiz}")
-    
-    questions = quiz.get('questions', [])
+async def _send_quiz_poll(context, quiz, chat_id):
+    """Send the quiz's current question as a poll and record it in the quiz"""
+    questions = quiz['questions']
     current_index = quiz.get('current_index', 0)
-    
-    # Try to get user info from the context
-    user_id = None
-    user_name = None
-    username = None
-    
-    if hasattr(update, 'effective_user') and update.effective_user:
-        user_id = update.effective_user.id
-        user_name = update.effective_user.first_name
-        username = update.effective_user.username
-        logger.info(f"User sending quiz: {user_name} (ID: {user_id})")
-    
-    # Store this info for later
-    if user_id and 'creator' not in quiz:
-        quiz['creator'] = {
-            'id': user_id,
-            'name': user_name,
-            'username': username
-        }
-        context.user_data['quiz'] = quiz
-    
-    # Check if we've gone through all questions
-    if current_index >= len(questions):
-        logger.info("All questions answered, ending quiz...")
-        # Log detailed info before ending
-        logger.info(f"Quiz data before ending: {json.dumps(quiz, default=str)}")
-        logger.info(f"Quiz chat_id before ending: {quiz.get('chat_id')}")
-        logger.info(f"Update object type: {type(update)}")
-        
-        # Make sure we're passing a valid update object
-        if not update or not hasattr(update, 'effective_chat'):
-            logger.warning("Update object is invalid in send_next_question, trying to use callback_query")
-            # Try to find a valid update object from context
-            callback_context = getattr(context, 'callback_query', None)
-            if callback_context:
-                update = callback_context
-                
-        # Force the quiz to stay active until we explicitly end it
-        quiz['active'] = True
-        context.user_data['quiz'] = quiz
-        
-        # Directly call end_quiz with correct parameters
-        await end_quiz(update, context)
-        return
-    
-    # Get the current question
     question = questions[current_index]
-    q_text = question.get("question", "Unknown Question")
-    options = question.get("options", [])
     
     # Get timer setting (default to 30 seconds if not set)
     timer_seconds = quiz.get('timer_seconds', 30)
     
-    # Send the poll
-    # Fix: Use proper chat_id from quiz or update with fallback
-    chat_id = quiz.get('chat_id') or getattr(update.effective_chat, 'id', None)
-    
-    # If chat_id is still None, log error and try to use a fallback
-    if chat_id is None:
-        logger.error("No chat_id available in quiz or update")
-        if hasattr(update, 'callback_query') and update.callback_query and update.callback_query.message:
-            chat_id = update.callback_query.message.chat_id
-            logger.info(f"Using callback query chat_id fallback: {chat_id}")
-    
-    # CRITICAL: Update the stored chat_id to ensure end_quiz can find it
-    if chat_id and 'chat_id' not in quiz:
-        logger.info(f"Updating quiz with resolved chat_id: {chat_id}")
-        quiz['chat_id'] = chat_id
-        context.user_data['quiz'] = quiz
-            
-    # Send the poll using the resolved chat_id
+    # Set by poll_answer once everyone expected to answer has done so
+    quiz['poll_done'] = asyncio.Event()
+    # Only a private chat (positive ID) has a known number of players
+    quiz['expected_answers'] = 1 if chat_id and chat_id > 0 else None
+    
     sent_message = await context.bot.send_poll(
         chat_id=chat_id,
-        question=q_text,
-        options=options,
+        question=question.question,
+        options=question.options,
         type=Poll.QUIZ,
-        correct_option_id=question.get("answer", 0),
+        correct_option_id=question.answer,
         is_anonymous=False,
         explanation=f"Question {current_index + 1} of {len(questions)}",
         open_period=timer_seconds,
     )
     
     # Store the poll details
-    quiz['sent_polls'][str(sent_message.poll.id)] = {
+    # Poll IDs are strings in the Bot API, so they are used as keys as-is
+    poll_id = sent_message.poll.id
+    quiz['sent_polls'][poll_id] = {
         'question_index': current_index,
         'message_id': sent_message.message_id,
-        'poll_id': sent_message.poll.id,
+        'poll_id': poll_id,
         'answers': {}
     }
+    # Let poll_answer find this quiz directly from the poll ID
+    context.bot_data.setdefault('poll_index', {})[poll_id] = (context.user_data, quiz)
     
     # Increment the question index
     quiz['current_index'] = current_index + 1
-    context.user_data['quiz'] = quiz
-    
-    # Wait for poll to close before sending next question
-    # Get timer setting (default to 30 seconds if not set)
-    timer_seconds = quiz.get('timer_seconds', 30)
-    await asyncio.sleep(timer_seconds + 2)  # Wait a bit longer than poll open period
-    
-    # Get the updated quiz from context to make sure we have all participant data
-    updated_quiz = context.user_data.get('quiz', {})
-    logger.info(f"Quiz data before next question: {updated_quiz}")
-    logger.info(f"Quiz participants before next question: {updated_quiz.get('participants', {})}")
-    
-    # Only continue if the quiz is still active
-    if updated_quiz.get('active', False):
-        await send_next_question(update, context)
+    return sent_message
+
+def _unindex_quiz_polls(context, quiz):
+    """Remove a quiz's polls from the poll ID lookup used by poll_answer"""
+    poll_index = context.bot_data.get('poll_index')
+    if poll_index and quiz:
+        for poll_id in quiz.get('sent_polls', {}):
+            poll_index.pop(poll_id, None)
+
+def _apply_stat_deltas(quiz):
+    """Add the answer counts tallied during a quiz to each user's statistics"""
+    for user_id, deltas in quiz.pop('stat_deltas', {}).items():
+        user_data = get_user_data(user_id)
+        user_data['total_answers'] = user_data.get('total_answers', 0) + deltas['total']
+        user_data['correct_answers'] = user_data.get('correct_answers', 0) + deltas['correct']
+        update_user_data(user_id, user_data)
+
+async def send_next_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Send the quiz questions one after another until the quiz ends"""
+    while True:
+        # Get the quiz data
+        quiz = context.user_data.get('quiz', {})
+        
+        # Debug: Log the quiz state 
+        logger.info("QUIZ STATE in send_next_question: %s", quiz)
+        
+        questions = quiz.get('questions', [])
+        current_index = quiz.get('current_index', 0)
+        
+        # Try to get user info from the context
+        user_id = None
+        user_name = None
+        username = None
+        
+        if hasattr(update, 'effective_user') and update.effective_user:
+            user_id = update.effective_user.id
+            user_name = update.effective_user.first_name
+            username = update.effective_user.username
+            logger.info(f"User sending quiz: {user_name} (ID: {user_id})")
+        
+        # Store this info for later
+        if user_id and 'creator' not in quiz:
+            quiz['creator'] = {
+                'id': user_id,
+                'name': user_name,
+                'username': username
+            }
+            context.user_data['quiz'] = quiz
+        
+        # Check if we've gone through all questions
+        if current_index >= len(questions):
+            logger.info("All questions answered, ending quiz...")
+            # Log detailed info before ending
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Quiz data before ending: %s", _log_json(quiz))
+            logger.info(f"Quiz chat_id before ending: {quiz.get('chat_id')}")
+            logger.info(f"Update object type: {type(update)}")
+            
+            # Make sure we're passing a valid update object
+            if not update or not hasattr(update, 'effective_chat'):
+                logger.warning("Update object is invalid in send_next_question, trying to use callback_query")
+                # Try to find a valid update object from context
+                callback_context = getattr(context, 'callback_query', None)
+                if callback_context:
+                    update = callback_context
+            
+            # Force the quiz to stay active until we explicitly end it
+            quiz['active'] = True
+            context.user_data['quiz'] = quiz
+            
+            # Directly call end_quiz with correct parameters
+            await end_quiz(update, context)
+            return
+        
+        # Fix: Use proper chat_id from quiz or update with fallback
+        chat_id = quiz.get('chat_id') or getattr(update.effective_chat, 'id', None)
+        
+        # If chat_id is still None, log error and try to use a fallback
+        if chat_id is None:
+            logger.error("No chat_id available in quiz or update")
+            if hasattr(update, 'callback_query') and update.callback_query and update.callback_query.message:
+                chat_id = update.callback_query.message.chat_id
+                logger.info(f"Using callback query chat_id fallback: {chat_id}")
+        
+        # CRITICAL: Update the stored chat_id to ensure end_quiz can find it
+        if chat_id and 'chat_id' not in quiz:
+            logger.info(f"Updating quiz with resolved chat_id: {chat_id}")
+            quiz['chat_id'] = chat_id
+            context.user_data['quiz'] = quiz
+        
+        sent_message = await _send_quiz_poll(context, quiz, chat_id)
+        
+        # Wait for the poll to close, or for everyone to answer, before the next question
+        try:
+            await asyncio.wait_for(quiz['poll_done'].wait(), timeout=quiz.get('timer_seconds', 30) + 2)
+        except asyncio.TimeoutError:
+            pass
+        # No more answers are expected, so stop routing this poll to the quiz
+        context.bot_data.get('poll_index', {}).pop(sent_message.poll.id, None)
+        
+        # Only continue if the quiz is still active
+        updated_quiz = context.user_data.get('quiz', {})
+        if not updated_quiz.get('active', False):
+            return
+        
+        # Get the updated quiz from context to make sure we have all participant data
+        logger.info("Quiz data before next question: %s", updated_quiz)
+        logger.info("Quiz participants before next question: %s", updated_quiz.get('participants', {}))
 
 async def poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle poll answers from users"""
@@ -1236,117 +1794,99 @@ async def poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     
     logger.info(f"Poll answer received from user {user.first_name} (ID: {user.id}) for poll {poll_id}")
     
-    # Try to find the active quiz in user data
-    active_quiz = None
-    active_context = None
-    found_user_id = None
-    
-    # IMPORTANT: Find all active quizzes regardless of which user started them
-    logger.info(f"Searching for active quiz with poll {poll_id}")
-    all_user_data_keys = list(context.dispatcher.user_data.keys())
-    logger.info(f"Available user_data keys: {all_user_data_keys}")
-    
-    # Check all user data for the active quiz with this poll
-    for user_id, user_data in context.dispatcher.user_data.items():
-        if 'quiz' in user_data and user_data['quiz'].get('active', False):
-            quiz = user_data['quiz']
-            logger.info(f"Found active quiz for user {user_id}, checking for poll {poll_id}")
-            sent_polls = quiz.get('sent_polls', {})
-            sent_poll_keys = list(sent_polls.keys())
-            logger.info(f"Quiz sent_polls keys: {sent_poll_keys}")
-            
-            # Check the poll ID with both string and regular format
-            if str(poll_id) in sent_polls:
-                active_quiz = quiz
-                active_context = user_data
-                found_user_id = user_id
-                logger.info(f"Found matching poll in quiz: {poll_id}")
-                break
-    
-    if not active_quiz:
+    # Find the quiz this poll belongs to, whichever user started it
+    active_context, active_quiz = context.bot_data.get('poll_index', {}).get(poll_id, (None, None))
+    
+    if not active_quiz or not active_quiz.get('active', False):
         logger.warning(f"Received answer for unknown poll: {poll_id}")
         return
     
     # Get the poll details
-    poll_info = active_quiz['sent_polls'].get(str(poll_id), {})
+    poll_info = active_quiz['sent_polls'][poll_id]
     question_index = poll_info.get('question_index', 0)
     
-    # Get the question to check the correct answer
-    questions = active_quiz.get('questions', [])
-    if question_index < len(questions):
-        question = questions[question_index]
-        correct_answer = question.get('answer', 0)
+    # Get the correct answer for this question
+    correct_answers = active_quiz.get('correct_answers', [])
+    if question_index < len(correct_answers):
+        correct_answer = correct_answers[question_index]
         
         # Record the user's answer
         user_id = user.id
         user_name = user.first_name
         
-        # Ensure participants dictionary exists
-        if 'participants' not in active_quiz:
-            active_quiz['participants'] = {}
-            
         # Initialize user in participants if not already there
-        if user_id not in active_quiz.get('participants', {}):
-            active_quiz['participants'][user_id] = {
+        participants = active_quiz.setdefault('participants', {})
+        participant = participants.get(user_id)
+        if participant is None:
+            participant = participants[user_id] = {
                 'name': user_name,
                 'username': user.username,
                 'correct': 0,
-                'answered': 0
+                'answered': 0,
+                'negative_points': 0.0
             }
         
         # Record the answer with detailed logging
-        logger.info(f"Before recording answer: Participant data: {active_quiz.get('participants', {})}")
-        active_quiz['participants'][user_id]['answered'] += 1
+        logger.info("Before recording answer: Participant data: %s", participants)
+        participant['answered'] += 1
         
         # Check if the answer is correct or wrong
         is_correct = answer.option_ids and answer.option_ids[0] == correct_answer
         
         if is_correct:
             # Add a point for correct answer
-            active_quiz['participants'][user_id]['correct'] += 1
+            participant['correct'] += 1
         else:
-            # Negative marking for incorrect answers (subtract 0.25 points)
-            # Initialize 'negative_points' if it doesn't exist
-            if 'negative_points' not in active_quiz['participants'][user_id]:
-                active_quiz['participants'][user_id]['negative_points'] = 0
-            
-            # Add 0.25 to negative points (will be subtracted from total score)
-            active_quiz['participants'][user_id]['negative_points'] += 0.25
-            logger.info(f"Added negative marking for user {user_id}, total negative: {active_quiz['participants'][user_id]['negative_points']}")
-        
-        # Ensure answers dictionary exists in poll_info
-        if 'answers' not in poll_info:
-            poll_info['answers'] = {}
+            # Negative marking for incorrect answers (subtract 0.25 points),
+            # which will be subtracted from the total score
+            participant['negative_points'] += 0.25
+            logger.info(f"Added negative marking for user {user_id}, total negative: {participant['negative_points']}")
         
         # Update the quiz data
-        poll_info['answers'][user_id] = {
+        answers = poll_info.setdefault('answers', {})
+        answers[user_id] = {
             'option_id': answer.option_ids[0] if answer.option_ids else None,
             'is_correct': answer.option_ids and answer.option_ids[0] == correct_answer,
             'user_name': user_name,  # Store user's name with the answer
             'username': user.username  # Store username too
         }
-        active_quiz['sent_polls'][str(poll_id)] = poll_info
         
         # Make sure the current participant info is properly stored
         logger.info(f"Recording answer for user: {user_name} (ID: {user_id})")
-        logger.info(f"After recording answer: Participant data: {active_quiz.get('participants', {})}")
+        logger.info("After recording answer: Participant data: %s", participants)
         
         # Update user context
         active_context['quiz'] = active_quiz
         
-        # Update user statistics
-        user_data = get_user_data(user_id)
-        user_data['total_answers'] = user_data.get('total_answers', 0) + 1
-        if answer.option_ids and answer.option_ids[0] == correct_answer:
-            user_data['correct_answers'] = user_data.get('correct_answers', 0) + 1
-        update_user_data(user_id, user_data)
+        # Move on early once everyone expected to answer the current poll has
+        expected_answers = active_quiz.get('expected_answers')
+        poll_done = active_quiz.get('poll_done')
+        if (poll_done and expected_answers
+                and question_index == active_quiz.get('current_index', 0) - 1
+                and len(answers) >= expected_answers):
+            poll_done.set()
+        
+        # Tally user statistics; they are written once when the quiz ends
+        deltas = active_quiz.setdefault('stat_deltas', {}).setdefault(user_id, {'total': 0, 'correct': 0})
+        deltas['total'] += 1
+        if is_correct:
+            deltas['correct'] += 1
+
+def resolve_chat_id(quiz, update):
+    """Return the chat to post quiz results in, falling back to the update's chat"""
+    return (
+        quiz.get('chat_id')
+        or getattr(getattr(update, 'effective_chat', None), 'id', None)
+        or getattr(getattr(getattr(update, 'callback_query', None), 'message', None), 'chat_id', None)
+        or getattr(getattr(update, 'message', None), 'chat_id', None)
+    )
 
 async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """End the quiz and display results"""
     quiz = context.user_data.get('quiz', {})
     
     # Debug: Log the entire quiz data
-    logger.info(f"Quiz data at end_quiz: {quiz}")
+    logger.info("Quiz data at end_quiz: %s", quiz)
     logger.info(f"Update type in end_quiz: {type(update)}")
     
     # Check if it's actually active - if not, we still want to try to show results
@@ -1360,37 +1900,16 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     # Look for participant information in sent polls
     sent_polls = quiz.get('sent_polls', {})
-    logger.info(f"Sent polls data: {sent_polls}")
+    logger.info("Sent polls data: %s", sent_polls)
     
-    # ALWAYS reconstruct the participants dictionary from poll answers to ensure accurate data
-    logger.info("Reconstructing ALL participants data from poll answers")
-    participants = {}
+    # Answers to this quiz's polls no longer need to be routed to it
+    _unindex_quiz_polls(context, quiz)
     
-    # Loop through all sent polls to gather participant information
-    for poll_id, poll_info in sent_polls.items():
-        logger.info(f"Processing poll {poll_id} with data: {poll_info}")
-        answers_data = poll_info.get('answers', {})
-        logger.info(f"Poll answers: {answers_data}")
-        
-        for user_id_str, answer_data in answers_data.items():
-            # Convert user_id to integer if it's a string
-            user_id = int(user_id_str) if isinstance(user_id_str, str) else user_id_str
-            
-            # Initialize user if needed
-            if user_id not in participants:
-                participants[user_id] = {
-                    'name': answer_data.get('user_name', f"Player {len(participants)+1}"),
-                    'username': answer_data.get('username', ''),
-                    'correct': 0,
-                    'answered': 0
-                }
-            
-            # Update answer counts
-            participants[user_id]['answered'] += 1
-            if answer_data.get('is_correct', False):
-                participants[user_id]['correct'] += 1
-                
-            logger.info(f"Added/updated participant {user_id}: {participants[user_id]}")
+    # Apply the statistics tallied during the quiz, one update per user
+    _apply_stat_deltas(quiz)
+    
+    # poll_answer keeps the participant tallies up to date as answers arrive
+    participants = quiz.get('participants') or {}
     
     # If we don't have participant data from poll answers, use the quiz creator as the participant
     # This is a fallback for when Telegram doesn't send poll_answer events
@@ -1408,11 +1927,11 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
                 'answered': len(quiz.get('questions', []))
             }
     
-    # Update the quiz with reconstructed participants
+    # Update the quiz with the final participants
     quiz['participants'] = participants
     context.user_data['quiz'] = quiz
     
-    logger.info(f"Final participants data at end_quiz: {participants}")
+    logger.info("Final participants data at end_quiz: %s", participants)
     
     # Even if no participants, show the quiz creator in the results
     if not participants:
@@ -1438,7 +1957,7 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             question_index = poll_info.get('question_index', 0)
             if question_index < len(quiz.get('questions', [])):
                 # Get the correct answer for this question
-                correct_option = quiz['questions'][question_index].get('answer', 0)
+                correct_option = quiz['questions'][question_index].answer
                 
                 # For demonstration, we're assuming the user selected the correct answers
                 # In a real scenario, we would get this from poll.get_poll() or similar
@@ -1455,18 +1974,25 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     # Sort participants by correct answers in descending order
     # Also consider negative points in ranking (subtract from correct)
-    sorted_participants = sorted(
-        participants.items(),
-        key=lambda x: (
-            x[1].get('correct', 0) - x[1].get('negative_points', 0),  # First sort by corrected score 
-            -x[1].get('answered', 0)  # Then by answered count (break ties)
-        ),
-        reverse=True
-    )
+    # Keys are negated so a plain ascending tuple sort ranks them; the position
+    # keeps tied participants in their original order and is never equal
+    keyed = [
+        (
+            data.get('negative_points', 0) - data.get('correct', 0),  # First sort by corrected score
+            data.get('answered', 0),  # Then by answered count (break ties)
+            position,
+            user_id,
+            data
+        )
+        for position, (user_id, data) in enumerate(participants.items())
+    ]
+    keyed.sort()
+    sorted_participants = [(user_id, data) for _, _, _, user_id, data in keyed]
     
     # Create the results message
     questions_count = len(quiz.get('questions', []))
-    results_message = f"🏁 The quiz has finished!\n\n{questions_count} questions answered\n\n"
+    pct_scale = (100.0 / questions_count) if questions_count else 0.0
+    parts = [f"🏁 The quiz has finished!\n\n{questions_count} questions answered\n\n"]
     
     # Always ensure there's a winner list shown (matches format in screenshot)
     if sorted_participants:
@@ -1475,8 +2001,7 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         winner_name = winner_data.get('name', 'Unknown Player')
         
         # Show congratulations to the specific winner
-        results_message += f"🏆 Congratulations to the winner: {winner_name}!\n\n"
-        results_message += f"📊 Final Rankings:\n\n"
+        parts.append(f"🏆 Congratulations to the winner: {winner_name}!\n\n📊 Final Rankings:\n\n")
         
         # Add ALL participant rankings with emoji indicators
         for i, (user_id, data) in enumerate(sorted_participants):
@@ -1499,78 +2024,52 @@ async def end_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             if negative_points > 0:
                 score_text = f"{correct}-{negative_points:.2f}={adjusted_score:.2f}"
                 # Calculate percentage with negative marking
-                percentage = (adjusted_score / questions_count) * 100 if questions_count > 0 else 0
-                results_message += f"{rank_emoji} {name}{username_text}: {score_text}/{questions_count} ({percentage:.1f}%)\n"
+                percentage = adjusted_score * pct_scale
+                parts.append(f"{rank_emoji} {name}{username_text}: {score_text}/{questions_count} ({percentage:.1f}%)\n")
             else:
                 # Standard display without negative marking
-                percentage = (correct / questions_count) * 100 if questions_count > 0 else 0
-                results_message += f"{rank_emoji} {name}{username_text}: {correct}/{questions_count} ({percentage:.1f}%)\n"
+                percentage = correct * pct_scale
+                parts.append(f"{rank_emoji} {name}{username_text}: {correct}/{questions_count} ({percentage:.1f}%)\n")
     
-    # Send the results with more robust chat_id handling
-    chat_id = quiz.get('chat_id')
+    results_message = "".join(parts)
     
-    # If chat_id is missing, try multiple fallbacks
-    if not chat_id:
-        logger.warning("No chat_id in quiz for results message, trying fallbacks")
-        
-        # Try to get from update object
-        if hasattr(update, 'effective_chat') and update.effective_chat:
-            chat_id = update.effective_chat.id
-            logger.info(f"Using effective_chat fallback: {chat_id}")
-        elif hasattr(update, 'callback_query') and update.callback_query and update.callback_query.message:
-            chat_id = update.callback_query.message.chat_id
-            logger.info(f"Using callback_query fallback: {chat_id}")
-        elif hasattr(update, 'message') and update.message:
-            chat_id = update.message.chat_id
-            logger.info(f"Using message fallback: {chat_id}")
-    
-    # If we still don't have a chat_id, use a default one from sample data (this is a last resort)
+    # Send the results with more robust chat_id handling
+    chat_id = resolve_chat_id(quiz, update)
     if not chat_id:
-        logger.error("Could not find any valid chat_id for results, using hardcoded fallback")
-        # This is a direct message with the bot typically
-        first_poll = next(iter(sent_polls.values()), {})
-        if 'message_id' in first_poll:
-            try:
-                # Try to get chat_id from the first poll's message
-                poll_message = await context.bot.get_chat(first_poll.get('message_id'))
-                chat_id = poll_message.chat.id
-                logger.info(f"Retrieved chat_id from poll message: {chat_id}")
-            except Exception as e:
-                logger.error(f"Failed to get chat from message: {e}")
+        logger.error("Could not find any valid chat_id for results")
     
     # Log the final chat_id and results message
-    logger.info(f"Sending results to chat_id: {chat_id}")
-    logger.info(f"Results message: {results_message}")
+    logger.debug("Sending results to chat_id: %s", chat_id)
+    logger.debug("Results message: %s", results_message)
     
-    try:
-        # Send the results with explicit error handling
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=results_message
-        )
-        logger.info("Successfully sent quiz results!")
-    except Exception as e:
-        logger.error(f"Failed to send results: {e}")
-        # Try one more time with a different approach if available
+    async def send_results():
         try:
-            if hasattr(update, 'callback_query') and update.callback_query and update.callback_query.message:
-                await update.callback_query.message.reply_text(results_message)
-                logger.info("Sent results via callback query message reply")
-            elif hasattr(update, 'message') and update.message:
-                await update.message.reply_text(results_message)
-                logger.info("Sent results via message reply")
-        except Exception as e2:
-            logger.error(f"Also failed to send results via alternate method: {e2}")
-    
-    # Update quiz statistics for participants
-    for user_id, data in participants.items():
-        user_data = get_user_data(int(user_id))
-        user_data['quizzes_taken'] = user_data.get('quizzes_taken', 0) + 1
-        update_user_data(int(user_id), user_data)
+            # Send the results with explicit error handling
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text=results_message
+            )
+            logger.info("Successfully sent quiz results!")
+        except Exception as e:
+            logger.error(f"Failed to send results: {e}")
+            # Try one more time with a different approach if available
+            try:
+                if hasattr(update, 'callback_query') and update.callback_query and update.callback_query.message:
+                    await update.callback_query.message.reply_text(results_message)
+                    logger.info("Sent results via callback query message reply")
+                elif hasattr(update, 'message') and update.message:
+                    await update.message.reply_text(results_message)
+                    logger.info("Sent results via message reply")
+            except Exception as e2:
+                logger.error(f"Also failed to send results via alternate method: {e2}")
+    
+    # Update quiz statistics for participants, writing them while the results are sent
+    bulk_increment_quizzes_taken(int(user_id) for user_id in participants)
+    await asyncio.gather(send_results(), _run_io(flush_users))
 
 async def category_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Start a quiz from a specific category"""
-    questions = load_questions()
+    questions = await aload_questions()
     
     if not questions:
         await update.message.reply_text(
@@ -1578,21 +2077,9 @@ async def category_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         return
     
-    # Get unique categories
-    categories = sorted(set(q.get("category", "Unknown") for q in questions))
-    
-    # Create keyboard with categories
-    keyboard = []
-    for i in range(0, len(categories), 2):
-        row = []
-        row.append(InlineKeyboardButton(categories[i], callback_data=f"cat_{categories[i]}"))
-        if i + 1 < len(categories):
-            row.append(InlineKeyboardButton(categories[i+1], callback_data=f"cat_{categories[i+1]}"))
-        keyboard.append(row)
-    
     await update.message.reply_text(
         "Select a category for the quiz:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=category_quiz_markup()
     )
 
 async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1601,10 +2088,8 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     category = query.data.replace("cat_", "")
-    questions = load_questions()
-    
-    # Filter questions by selected category
-    category_questions = [q for q in questions if q.get("category") == category]
+    await aload_questions()
+    category_questions = questions_in_category(category)
     
     if not category_questions:
         await query.edit_message_text(f"No questions found in category: {category}")
@@ -1612,7 +2097,12 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Select random questions (up to 5)
     num_questions = min(5, len(category_questions))
-    selected_questions = random.sample(category_questions, num_questions)
+    if num_questions == len(category_questions):
+        # Taking every question, so only the order needs randomizing
+        selected_questions = category_questions[:]
+        _RNG.shuffle(selected_questions)
+    else:
+        selected_questions = _RNG.sample(category_questions, num_questions)
     
     # Store the category and questions in temporary data
     # Add support for command arguments like IDs
@@ -1634,13 +2124,7 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     }
     
     # Ask user to select a timer duration
-    keyboard = [
-        [
-            InlineKeyboardButton("15 seconds", callback_data="timer_15"),
-            InlineKeyboardButton("30 seconds", callback_data="timer_30"),
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = TIMER_MARKUP
     
     await query.edit_message_text(
         f"📊 Selected {num_questions} questions from '{category}'\n\n"
@@ -1691,7 +2175,7 @@ async def clone_from_url(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not url.startswith(('http://', 'https://', 't.me/')):
         if 't.me/' in url:
             # Extract and format it properly
-            match = re.search(r't\.me/([^/\s]+/\d+)', url)
+            match = _TME_RE.search(url)
             if match:
                 url = f"https://t.me/{match.group(1)}"
             else:
@@ -1720,7 +2204,7 @@ async def clone_from_url(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     # Try to parse the URL with a timeout to prevent hanging
     try:
-        quiz_data = parse_telegram_quiz_url(url)
+        quiz_data = await parse_telegram_quiz_url(url)
         
         # Update the progress message with results
         if not quiz_data:
@@ -1786,7 +2270,7 @@ async def clone_manual(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 async def clone_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle options input for cloning"""
     options_text = update.message.text
-    options = [opt.strip() for opt in options_text.split('\n') if opt.strip()]
+    options = [opt for opt in (raw.strip() for raw in options_text.splitlines()) if opt]
     
     if len(options) < 2:
         await update.message.reply_text(
@@ -1819,18 +2303,9 @@ async def clone_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             return ANSWER
         
         # Ask for category
-        keyboard = [
-            ["Geography", "Science", "History"],
-            ["Literature", "Sports", "Entertainment"],
-            ["General Knowledge", "Other"]
-        ]
-        
         await update.message.reply_text(
             "Finally, select a category for this question:",
-            reply_markup=InlineKeyboardMarkup([
-                [InlineKeyboardButton(cat, callback_data=f"clone_cat_{cat}") for cat in row]
-                for row in keyboard
-            ])
+            reply_markup=CLONE_CAT_MARKUP
         )
         
         context.user_data['clone_answer'] = answer_index
@@ -1862,10 +2337,9 @@ async def clone_category_callback(update: Update, context: ContextTypes.DEFAULT_
         "category": category
     }
     
-    # Load existing questions, add new one, and save
-    questions = load_questions()
-    questions.append(question_data)
-    success = save_questions(questions)
+    # Add the new question to the cache; it is written on the next flush
+    await aload_questions()
+    success = store_question(question_data)
     
     if success:
         await query.edit_message_text(
@@ -1879,10 +2353,55 @@ async def clone_category_callback(update: Update, context: ContextTypes.DEFAULT_
             "❌ There was an error saving the question. Please try again."
         )
 
+async def post_init(application: Application) -> None:
+    """Load data and connect clients once the bot is initialized"""
+    # Read the data files once up front; handlers then work from memory
+    await aload_questions()
+    await aload_users()
+    # Loading may have created default data in a worker thread
+    _schedule_flush()
+    
+    # Connect the Pyrogram client up front so /clone doesn't pay for the handshake
+    api_id = os.getenv('API_ID')
+    api_hash = os.getenv('API_HASH')
+    if Client and api_id and api_hash and BOT_TOKEN:
+        try:
+            await get_pyrogram_client(api_id, api_hash, BOT_TOKEN)
+            logger.info("Pyrogram client started")
+        except Exception as e:
+            logger.error(f"Could not start Pyrogram client: {e}")
+
+async def post_shutdown(application: Application) -> None:
+    """Write any pending changes and close clients"""
+    if _FLUSH_TASK is not None:
+        _FLUSH_TASK.cancel()
+    # Queued behind any write already in progress on the I/O thread
+    await _run_io(lambda: flush_questions(compact=True))
+    await _run_io(flush_users)
+    _IO_EXECUTOR.shutdown()
+    
+    if _PYROGRAM_CLIENT is not None:
+        await _PYROGRAM_CLIENT.stop()
+    await _HTTPX.aclose()
+
 def main() -> None:
     """Run the bot."""
+    # Use the libuv event loop where it's available (Linux/macOS)
+    if uvloop:
+        uvloop.install()
+    
     # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Outgoing API calls get their own large connection pool so bursts of
+    # callbacks don't wait on the long-polling getUpdates connection
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(HTTPXRequest(connection_pool_size=64, pool_timeout=10))
+        .get_updates_request(HTTPXRequest(connection_pool_size=4, read_timeout=60, write_timeout=60))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -1933,7 +2452,7 @@ def main() -> None:
     application.add_handler(clone_conv_handler)
     
     # Add callback query handlers
-    application.add_handler(CallbackQueryHandler(category_callback, pattern=r"^category_"))
+    application.add_handler(CallbackQueryHandler(add_question_category_callback, pattern=r"^category_"))
     application.add_handler(CallbackQueryHandler(delete_callback, pattern=r"^delete_"))
     application.add_handler(CallbackQueryHandler(category_callback, pattern=r"^cat_"))
     application.add_handler(CallbackQueryHandler(clone_method_callback, pattern=r"^clone_"))
@@ -1943,9 +2462,12 @@ def main() -> None:
     application.add_handler(CommandHandler("poll2q", poll_to_question))
     application.add_handler(CallbackQueryHandler(handle_poll_answer_callback, pattern=r"^poll_answer_"))
     application.add_handler(CallbackQueryHandler(handle_poll_category_selection, pattern=r"^pollcat_"))
-    application.add_handler(CallbackQueryHandler(handle_poll_id_selection, pattern=r"^pollid_"))
-    application.add_handler(CallbackQueryHandler(handle_poll_custom_selection, pattern=r"^pollcustom_"))
-    application.add_handler(CallbackQueryHandler(handle_poll_use_id, pattern=r"^pollid_use_"))
+    application.add_handler(CallbackQueryHandler(handle_poll_id_auto, pattern=r"^pollid_auto$"))
+    application.add_handler(CallbackQueryHandler(handle_poll_id_custom, pattern=r"^pollid_custom$"))
+    application.add_handler(CallbackQueryHandler(handle_poll_id_existing, pattern=r"^pollid_existing$"))
+    application.add_handler(CallbackQueryHandler(handle_poll_use_id, pattern=r"^pollid_use_-?\d+$"))
+    application.add_handler(CallbackQueryHandler(handle_poll_custom_input, pattern=r"^pollcustom_input$"))
+    application.add_handler(CallbackQueryHandler(handle_poll_custom_selection, pattern=r"^pollcustom_\d+$"))
     
     # Add message handler for custom ID input
     application.add_handler(MessageHandler(
@@ -1954,10 +2476,37 @@ def main() -> None:
     ))
     
     # Register a poll answer handler
-    application.add_handler(PollHandler(poll_answer))
+    application.add_handler(PollAnswerHandler(poll_answer))
     
     # Start the Bot
-    application.run_polling()
+    if WEBHOOK_URL:
+        # Telegram pushes updates to us, so there is no getUpdates round trip per update
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            url_path=BOT_TOKEN,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{BOT_TOKEN}"
+        )
+    else:
+        application.run_polling(timeout=POLLING_TIMEOUT)
+
+@dataclass(slots=True)
+class PollConvState:
+    """Progress of one /poll2q conversion, kept in user_data['pollconv']"""
+    question: str = ''
+    options: list = field(default_factory=list)
+    correct_answer: int = 0
+    category: str = 'General Knowledge'
+    message_id: int | None = None
+    waiting_for_custom_id: bool = False
+    custom_id_preset: int | None = None
+
+def poll_state(context):
+    """Return the user's poll conversion state, starting a new one if needed"""
+    state = context.user_data.get('pollconv')
+    if state is None:
+        state = context.user_data['pollconv'] = PollConvState()
+    return state
 
 async def poll_to_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Convert a Telegram poll to a quiz question with enhanced styling"""
@@ -1972,7 +2521,7 @@ async def poll_to_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         if arg.startswith('id='):
             try:
                 custom_id = int(arg.split('=')[1])
-                context.user_data['custom_id_preset'] = custom_id
+                poll_state(context).custom_id_preset = custom_id
             except ValueError:
                 await update.message.reply_text("❌ Invalid ID format. Using auto ID instead.")
         elif arg.startswith('start='):
@@ -1994,21 +2543,22 @@ async def poll_to_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         options = [option.text for option in poll.options]
         
         # Fancy styled header with sparkle emojis
-        welcome_message = (
+        parts = [
             "✨ *QUIZ CREATOR WIZARD* ✨\n\n"
             "🔍 I'm analyzing your poll...\n"
             "─────────────────────\n"
             "📋 *Question*: \n"
             f"`{question_text}`\n\n"
-            "📊 *Options*: " + str(len(options)) + "\n"
-        )
+            f"📊 *Options*: {len(options)}\n"
+        ]
         
         # Add styling to display the options
         for i, option in enumerate(options):
-            emoji = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"][i] if i < 10 else f"{i+1}."
-            welcome_message += f"{emoji} {option}\n"
+            emoji = _OPT_EMOJI[i] if i < 10 else f"{i+1}."
+            parts.append(f"{emoji} {option}\n")
         
-        welcome_message += "\n─────────────────────"
+        parts.append("\n─────────────────────")
+        welcome_message = "".join(parts)
         
         # Check if this is a quiz poll with correct option
         if poll.type == Poll.QUIZ and poll.correct_option_id is not None:
@@ -2018,35 +2568,23 @@ async def poll_to_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             welcome_message += (
                 "\n✅ *Quiz Type*: Official Quiz Poll\n"
                 f"🎯 *Correct Answer*: {correct_option}\n\n"
-                "⚡️ *Ready to convert this to a quiz question!*"
+                "⚡️ *Ready to convert this to a quiz question!*\n\n"
+                "📚 Please select a category for this question:"
             )
             
-            # Send analysis and ask for category
+            # Send analysis and ask for category in one message
             initial_message = await update.message.reply_text(
                 welcome_message,
-                parse_mode='Markdown'
-            )
-            
-            # Ask for category using a nice grid
-            keyboard = [
-                ["Geography", "Science", "History"],
-                ["Literature", "Sports", "Entertainment"],
-                ["General Knowledge", "Other"]
-            ]
-            
-            await update.message.reply_text(
-                "📚 Please select a category for this question:",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton(cat, callback_data=f"pollcat_{cat}") for cat in row]
-                    for row in keyboard
-                ])
+                parse_mode='Markdown',
+                reply_markup=POLL_CAT_MARKUP
             )
             
             # Store the poll data in user context
-            context.user_data['poll_question'] = question_text
-            context.user_data['poll_options'] = options
-            context.user_data['poll_correct_answer'] = correct_answer
-            context.user_data['poll_message_id'] = initial_message.message_id
+            state = poll_state(context)
+            state.question = question_text
+            state.options = options
+            state.correct_answer = correct_answer
+            state.message_id = initial_message.message_id
             
         else:
             # Regular poll (not a quiz), we need to ask for the correct answer
@@ -2078,9 +2616,10 @@ async def poll_to_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             )
             
             # Store the poll data in user context
-            context.user_data['poll_question'] = question_text
-            context.user_data['poll_options'] = options
-            context.user_data['poll_message_id'] = initial_message.message_id
+            state = poll_state(context)
+            state.question = question_text
+            state.options = options
+            state.message_id = initial_message.message_id
     else:
         # Not a reply to a poll
         await update.message.reply_text(
@@ -2099,11 +2638,12 @@ async def handle_poll_answer_callback(update: Update, context: ContextTypes.DEFA
     correct_answer = int(data)
     
     # Get the poll data from context
-    question_text = context.user_data.get('poll_question', '')
-    options = context.user_data.get('poll_options', [])
+    state = poll_state(context)
+    question_text = state.question
+    options = state.options
     
     # Store the correct answer in context
-    context.user_data['poll_correct_answer'] = correct_answer
+    state.correct_answer = correct_answer
     
     # Confirm the selection
     await query.edit_message_text(
@@ -2113,18 +2653,9 @@ async def handle_poll_answer_callback(update: Update, context: ContextTypes.DEFA
     )
     
     # Ask for category
-    keyboard = [
-        ["Geography", "Science", "History"],
-        ["Literature", "Sports", "Entertainment"],
-        ["General Knowledge", "Other"]
-    ]
-    
     await query.message.reply_text(
         "📚 Please select a category for this question:",
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton(cat, callback_data=f"pollcat_{cat}") for cat in row]
-            for row in keyboard
-        ])
+        reply_markup=POLL_CAT_MARKUP
     )
 
 async def save_poll_as_question(update, context, question_text, options, correct_answer):
@@ -2155,10 +2686,11 @@ async def handle_poll_category_selection(update: Update, context: ContextTypes.D
     category = query.data.replace("pollcat_", "")
     
     # Store the category in context
-    context.user_data['poll_category'] = category
+    state = poll_state(context)
+    state.category = category
     
     # Get the poll data from context
-    question_text = context.user_data.get('poll_question', '')
+    question_text = state.question
     
     # Confirmation message with the selected category
     await query.edit_message_text(
@@ -2167,108 +2699,75 @@ async def handle_poll_category_selection(update: Update, context: ContextTypes.D
         parse_mode='Markdown'
     )
     
-    # Ask for ID method - automatic or custom
-    keyboard = [
-        [
-            InlineKeyboardButton("🔢 Auto ID", callback_data="pollid_auto"),
-            InlineKeyboardButton("🔢 Custom ID", callback_data="pollid_custom")
-        ],
-        [
-            InlineKeyboardButton("🔄 Existing ID", callback_data="pollid_existing")
-        ]
-    ]
-    
     # If a custom ID was preset in the command arguments, use it directly
-    if 'custom_id_preset' in context.user_data:
-        await handle_poll_id_selection(update, context)
+    if state.custom_id_preset is not None:
+        await save_final_poll_question(update, context, state.custom_id_preset)
         return
     
     await query.message.reply_text(
         "How would you like to assign an ID to this question?",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=_POLL_ID_METHOD_MARKUP
     )
 
-async def handle_poll_id_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle ID method selection for poll conversion"""
-    # If this function was called directly (not from a callback)
-    if not hasattr(update, 'callback_query') or update.callback_query is None:
-        # Check for preset ID
-        if 'custom_id_preset' in context.user_data:
-            custom_id = context.user_data['custom_id_preset']
-            
-            # Confirm and save with this ID
-            await save_final_poll_question(update, context, custom_id)
-            return
-    else:
-        query = update.callback_query
-        await query.answer()
-        
-        # Extract the selected ID method
-        id_method = query.data
-        
-        if id_method == "pollid_auto":
-            # Use auto ID - get the next available ID
-            await save_final_poll_question(update, context)
-        
-        elif id_method == "pollid_custom":
-            # Show the custom ID options
-            keyboard = [
-                [InlineKeyboardButton("1000", callback_data="pollcustom_1000")],
-                [InlineKeyboardButton("2000", callback_data="pollcustom_2000")],
-                [InlineKeyboardButton("Custom", callback_data="pollcustom_input")]
-            ]
-            
-            await query.edit_message_text(
-                "Select a starting ID or enter a custom one:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-        
-        elif id_method == "pollid_existing":
-            # Show a list of existing question IDs the user might want to overwrite
-            questions = load_questions()
-            
-            if not questions:
-                await query.edit_message_text(
-                    "No existing questions found. Your question will be saved with a new ID."
-                )
-                await save_final_poll_question(update, context)
-                return
-            
-            # Get the IDs of the first 10 questions
-            question_ids = [q.get('id') for q in sorted(questions, key=lambda q: q.get('id', 0))[:10]]
-            
-            # Create buttons for each ID
-            keyboard = []
-            row = []
-            for i, q_id in enumerate(question_ids):
-                row.append(InlineKeyboardButton(str(q_id), callback_data=f"pollid_use_{q_id}"))
-                if (i + 1) % 3 == 0 or i == len(question_ids) - 1:
-                    keyboard.append(row)
-                    row = []
-            
-            await query.edit_message_text(
-                "Select an existing question ID to overwrite:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
+async def handle_poll_id_auto(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Save the converted poll with the next available ID"""
+    await update.callback_query.answer()
+    await save_final_poll_question(update, context)
 
-async def handle_poll_custom_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle custom ID button selection callbacks"""
+async def handle_poll_id_custom(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the custom ID options for poll conversion"""
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_text(
+        "Select a starting ID or enter a custom one:",
+        reply_markup=_POLL_CUSTOM_MARKUP
+    )
+
+async def handle_poll_id_existing(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show existing question IDs the converted poll can overwrite"""
     query = update.callback_query
     await query.answer()
     
-    data = query.data
-    if data == "pollcustom_input":
+    questions = await aload_questions()
+    if not questions:
         await query.edit_message_text(
-            "Please enter a custom ID number for this question:"
+            "No existing questions found. Your question will be saved with a new ID."
         )
-        # Mark that we're waiting for custom ID input
-        context.user_data['waiting_for_custom_id'] = True
-    else:
-        # Extract the ID from the callback data
-        custom_id = int(data.replace("pollcustom_", ""))
-        
-        # Save the question with the custom ID
-        await save_final_poll_question(update, context, custom_id)
+        await save_final_poll_question(update, context)
+        return
+    
+    # Get the IDs of the first 10 questions
+    question_ids = smallest_question_ids(10)
+    
+    # Create buttons for each ID, three per row
+    keyboard = [
+        [InlineKeyboardButton(str(q_id), callback_data=_use_id_callback(q_id)) for q_id in question_ids[i:i + 3]]
+        for i in range(0, len(question_ids), 3)
+    ]
+    
+    await query.edit_message_text(
+        "Select an existing question ID to overwrite:",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def handle_poll_custom_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Ask for a typed custom ID for poll conversion"""
+    query = update.callback_query
+    await query.answer()
+    await query.edit_message_text(
+        "Please enter a custom ID number for this question:"
+    )
+    # Mark that we're waiting for custom ID input
+    poll_state(context).waiting_for_custom_id = True
+
+async def handle_poll_custom_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the preset custom ID buttons"""
+    query = update.callback_query
+    await query.answer()
+    
+    # Extract the ID from the callback data and save with it
+    custom_id = int(query.data.removeprefix(_PREFIX_CUSTOM))
+    await save_final_poll_question(update, context, custom_id)
 
 async def handle_poll_use_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle selection of an existing ID to use"""
@@ -2276,7 +2775,7 @@ async def handle_poll_use_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     # Extract the ID from the callback data
-    use_id = int(query.data.replace("pollid_use_", ""))
+    use_id = int(query.data.removeprefix(_PREFIX_USE))
     
     # Save the question with this existing ID (will overwrite)
     await save_final_poll_question(update, context, use_id)
@@ -2284,113 +2783,89 @@ async def handle_poll_use_id(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def handle_custom_id_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle custom ID input for poll conversion"""
     # Only process if we're waiting for custom ID input
-    if context.user_data.get('waiting_for_custom_id', False):
-        try:
-            custom_id = int(update.message.text.strip())
-            
-            # Clear the waiting flag
-            context.user_data['waiting_for_custom_id'] = False
-            
-            # Save the question with the custom ID
-            await save_final_poll_question(update, context, custom_id)
-        
-        except ValueError:
-            await update.message.reply_text(
-                "❌ Invalid ID. Please enter a valid number:"
-            )
+    state = context.user_data.get('pollconv')
+    if state is None or not state.waiting_for_custom_id:
+        return
+    
+    text = update.message.text.strip()
+    if not text.removeprefix('-').isdecimal():
+        await update.message.reply_text(
+            "❌ Invalid ID. Please enter a valid number:"
+        )
+        return
+    
+    # Clear the waiting flag
+    state.waiting_for_custom_id = False
+    
+    # Save the question with the custom ID
+    await save_final_poll_question(update, context, int(text))
 
 async def save_final_poll_question(update, context, custom_id=None):
     """Save the final question with all data"""
     # Get all the poll data from context
-    question_text = context.user_data.get('poll_question', '')
-    options = context.user_data.get('poll_options', [])
-    correct_answer = context.user_data.get('poll_correct_answer', 0)
-    category = context.user_data.get('poll_category', 'General Knowledge')
-    
-    # Determine the question ID
-    if custom_id is not None:
-        question_id = custom_id
-    else:
-        question_id = get_next_question_id()
-    
-    # Create the question data
-    question_data = {
-        "id": question_id,
-        "question": question_text,
-        "options": options,
-        "answer": correct_answer,
-        "category": category
-    }
-    
-    # Load existing questions
-    questions = load_questions()
-    
-    # Check if we're overwriting an existing question
-    existing_index = -1
-    for i, q in enumerate(questions):
-        if q.get('id') == question_id:
-            existing_index = i
-            break
-    
-    if existing_index >= 0:
-        # Replace the existing question
-        questions[existing_index] = question_data
-    else:
-        # Add as a new question
-        questions.append(question_data)
-    
-    # Save the updated questions
-    success = save_questions(questions)
+    state = poll_state(context)
+    question_text = state.question
+    options = state.options
+    correct_answer = state.correct_answer
+    category = state.category
+    
+    # Pick the ID and store the question as one step so concurrent
+    # conversions can't both claim the same next ID
+    async with _POLL_SAVE_LOCK:
+        await aload_questions()
+        
+        # Determine the question ID
+        if custom_id is not None:
+            question_id = custom_id
+        else:
+            question_id = get_next_question_id()
+        
+        # Create the question data
+        question_data = {
+            "id": question_id,
+            "question": question_text,
+            "options": options,
+            "answer": correct_answer,
+            "category": category
+        }
+        
+        # Add the question, replacing any existing question with this ID
+        success = store_question(question_data)
+        record = question_record(question_data)
     
     # Determine the response message
+    callback_query = getattr(update, 'callback_query', None)
     if success:
         batch_mode = context.user_data.get('batch_mode', False)
         
         # Craft a nice confirmation message
-        confirmation = (
-            f"✅ *Quiz question #{question_id} saved successfully!*\n\n"
-            f"📝 *Question:* {question_text}\n"
-            f"📋 *Options:* {len(options)}\n"
-            f"✳️ *Correct Answer:* {options[correct_answer]}\n"
-            f"📚 *Category:* {category}\n\n"
-        )
-        
-        if batch_mode:
-            confirmation += (
-                "🔄 Batch mode is active. Reply to another poll with /poll2q to continue adding questions.\n"
-                "IDs will auto-increment from the last used ID."
-            )
-        else:
-            confirmation += (
-                "You can now use:\n"
-                "• /quiz to start a quiz\n"
-                "• /category to choose a quiz by category\n"
-                "• /quiz id={question_id} to quiz with this exact question"
-            )
+        template = _POLL_SAVED_BATCH_TEMPLATE if batch_mode else _POLL_SAVED_TEMPLATE
+        confirmation = template.format_map({
+            'question_id': question_id,
+            'question': question_text,
+            'option_count': record.option_count,
+            'answer': record.answer_text,
+            'category': category,
+        })
         
         # Send the confirmation message
-        if hasattr(update, 'callback_query') and update.callback_query:
-            await update.callback_query.edit_message_text(
+        if callback_query is not None:
+            await callback_query.edit_message_text(
                 confirmation,
                 parse_mode='Markdown'
             )
-        else:
+        elif state.message_id:
             # This is a direct function call or message handler
-            message_id = context.user_data.get('poll_message_id')
-            if message_id:
-                # Get the original chat_id
-                chat_id = update.effective_chat.id
-                
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=confirmation,
-                    parse_mode='Markdown'
-                )
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=confirmation,
+                parse_mode='Markdown'
+            )
     else:
         error_message = "❌ There was an error saving the question. Please try again."
         
-        if hasattr(update, 'callback_query') and update.callback_query:
-            await update.callback_query.edit_message_text(error_message)
+        if callback_query is not None:
+            await callback_query.edit_message_text(error_message)
         else:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -2398,52 +2873,7 @@ async def save_final_poll_question(update, context, custom_id=None):
             )
     
     # Clean up context data
-    for key in ['poll_question', 'poll_options', 'poll_correct_answer', 
-                'poll_category', 'poll_message_id', 'waiting_for_custom_id', 'custom_id_preset']:
-        if key in context.user_data:
-            del context.user_data[key]
-
-async def test_results_display():
-    """Test function to verify quiz results display properly"""
-    # This is just for testing, used during development
-    participants = {
-        1: {'name': 'Alice', 'username': 'alice_user', 'correct': 5, 'answered': 5},
-        2: {'name': 'Bob', 'username': 'bob_user', 'correct': 3, 'answered': 5},
-        3: {'name': 'Charlie', 'username': None, 'correct': 4, 'answered': 5},
-    }
-    
-    # Sort by correct answers
-    sorted_participants = sorted(
-        participants.items(),
-        key=lambda x: (x[1].get('correct', 0), -x[1].get('answered', 0)),
-        reverse=True
-    )
-    
-    # Create the results message
-    questions_count = 5
-    results_message = f"🏁 The quiz has finished!\n\n{questions_count} questions answered\n\n"
-    
-    if sorted_participants:
-        winner_id, winner_data = sorted_participants[0]
-        winner_name = winner_data.get('name', 'Unknown Player')
-        
-        results_message += f"🏆 Congratulations to the winner: {winner_name}!\n\n"
-        results_message += f"📊 Final Rankings:\n\n"
-        
-        for i, (user_id, data) in enumerate(sorted_participants):
-            rank_emoji = ["🥇", "🥈", "🥉"][i] if i < 3 else f"{i+1}."
-            
-            correct = data.get('correct', 0)
-            name = data.get('name', f"Player {i+1}")
-            
-            username = data.get('username', '')
-            username_text = f" (@{username})" if username else ""
-            
-            percentage = (correct / questions_count) * 100 if questions_count > 0 else 0
-            
-            results_message += f"{rank_emoji} {name}{username_text}: {correct}/{questions_count} ({percentage:.1f}%)\n"
-    
-    print(results_message)
+    context.user_data.pop('pollconv', None)
 
 if __name__ == "__main__":
     try:
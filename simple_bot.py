@@ -3,11 +3,34 @@ Simple Telegram Quiz Bot implementation
 """
 import os
 import json
+import atexit
+import tempfile
 import random
 import asyncio
 import logging
 import re
+import time
+import threading
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    from pyrogram import Client
+except ImportError:
+    Client = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import orjson as _json_fast
+except ImportError:
+    _json_fast = None
 from urllib.parse import urlparse
 from telegram import Update, Poll, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -37,12 +60,134 @@ os.makedirs('data', exist_ok=True)
 QUESTIONS_FILE = 'data/questions.json'
 USERS_FILE = 'data/users.json'
 
+# Patterns used when cloning quizzes from t.me links
+_CHANNEL_RE = re.compile(r't\.me/([^/]+)/(\d+)')
+_TME_PATH_RE = re.compile(r't\.me/([^/\s]+/\d+)')
+_OPT_ALPHA_RE = re.compile(r'^[a-z][\.\)]\s*')
+_OPT_NUM_RE = re.compile(r'^\d+[\.\)]\s*')
+_OPT_ANY_RE = re.compile(r'^[A-Za-z0-9][\.\)]\s*')
+_POLL_QUESTION_RE = re.compile(r'<div class="tgme_widget_message_poll_question">([^<]+)</div>')
+_POLL_OPTION_RE = re.compile(r'<div class="tgme_widget_message_poll_option_text">([^<]+)</div>')
+_QUIZ_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in (
+        r'question:\s*([^\?]+\??)\s*options:(.+)',
+        r'quiz:\s*([^\?]+\??)\s*a\)(.*?)b\)(.*?)c\)(.*?)(d\).*?)?$',
+        r'([^\?]+\??)\s*a\.\s*(.*?)\s*b\.\s*(.*?)\s*c\.\s*(.*?)(\s*d\.\s*.*?)?$'
+    )
+]
+
+# Shared HTTP session so the page and embed fetches reuse one t.me connection
+HTTP_TIMEOUT = (3, 5)
+_HTTP = requests.Session()
+_HTTP.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+})
+_HTTP.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Long-lived Pyrogram client for reading channel messages, started in post_init
+_PYROGRAM_CLIENT = None
+
+# Parsed quiz per URL as (expires_at, result), least recently used first;
+# failed lookups expire sooner
+URL_CACHE_TTL = 3600
+URL_CACHE_MISS_TTL = 60
+URL_CACHE_SIZE = 512
+_URL_CACHE = OrderedDict()
+
+# Seconds between background writes of pending question and user changes
+FLUSH_INTERVAL = 2
+
+# Snapshots are taken on the event loop, which owns the caches; the writes run on
+# this single worker, and the lock also covers the flush at interpreter exit
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=1)
+_FLUSH_LOCK = threading.Lock()
+
+# Parsed copies of the JSON files, reused until the file's (mtime_ns, size) changes
+# "dirty" marks unsaved changes and "writing" is set while a flush is on disk
+# Questions are kept in "by_id" as lists per ID (several questions may share one);
+# "data" is the flat list, rebuilt from "by_id" only after a change
+_QUESTIONS_CACHE = {
+    "stamp": None, "data": None, "dirty": False, "writing": False, "by_id": {}, "max_id": 0
+}
+_USERS_CACHE = {"stamp": None, "data": None, "dirty": False, "writing": False}
+
+def _file_stamp(path):
+    """Return a value that changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _load_json(raw):
+    """Parse UTF-8 JSON bytes"""
+    if msgspec:
+        return msgspec.json.decode(raw)
+    if _json_fast:
+        return _json_fast.loads(raw)
+    return json.loads(raw)
+
+def _dump_json(data):
+    """Serialize data to UTF-8 JSON bytes"""
+    if msgspec:
+        return msgspec.json.encode(data)
+    if _json_fast:
+        return _json_fast.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def _atomic_write(path, payload):
+    """Write payload to a temp file and swap it in, so a crash never leaves a torn file"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _index_questions(questions):
+    """Replace the cached questions with the given list, grouped by ID"""
+    by_id = {}
+    for question in questions:
+        by_id.setdefault(question.get("id"), []).append(question)
+    _QUESTIONS_CACHE["by_id"] = by_id
+    _QUESTIONS_CACHE["data"] = questions
+    _QUESTIONS_CACHE["max_id"] = max((q.get("id", 0) for q in questions), default=0)
+
+def _questions_view():
+    """Return the cached questions as a flat list, rebuilding it after a change"""
+    questions = _QUESTIONS_CACHE["data"]
+    if questions is None:
+        # Snapshot the groups first; the flush thread may call this while the loop edits them
+        questions = [q for group in list(_QUESTIONS_CACHE["by_id"].values()) for q in group]
+        _QUESTIONS_CACHE["data"] = questions
+    return questions
+
+def _questions_changed():
+    """Drop the flat list and mark the questions for the next flush"""
+    _QUESTIONS_CACHE["data"] = None
+    _QUESTIONS_CACHE["dirty"] = True
+
 def load_questions():
     """Load questions from the JSON file"""
+    # Hand out a copy so callers can't change the cache behind save_questions' back
+    return list(_load_questions())
+
+def _load_questions():
+    """Return the cached question list, re-reading the file if it changed"""
     try:
+        # Unflushed or half-written changes in memory are newer than anything on disk
+        if _QUESTIONS_CACHE["dirty"] or _QUESTIONS_CACHE["writing"]:
+            return _questions_view()
         if os.path.exists(QUESTIONS_FILE):
-            with open(QUESTIONS_FILE, 'r', encoding='utf-8') as file:
-                questions = json.load(file)
+            stamp = _file_stamp(QUESTIONS_FILE)
+            if stamp == _QUESTIONS_CACHE["stamp"]:
+                return _questions_view()
+            
+            with open(QUESTIONS_FILE, 'rb') as file:
+                questions = _load_json(file.read())
+            _QUESTIONS_CACHE["stamp"] = stamp
+            _index_questions(questions)
             logger.info(f"Loaded {len(questions)} questions")
             return questions
         else:
@@ -70,41 +215,168 @@ def load_questions():
         return []
 
 def save_questions(questions):
-    """Save questions to the JSON file"""
-    try:
-        with open(QUESTIONS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(questions, file, ensure_ascii=False, indent=4)
-        logger.info(f"Saved {len(questions)} questions")
+    """Mark questions as changed; the flusher writes them to the JSON file"""
+    _index_questions(list(questions))
+    _QUESTIONS_CACHE["dirty"] = True
+    return True
+
+def add_question(question):
+    """Add a question to the cache and mark it for saving"""
+    _load_questions()
+    _QUESTIONS_CACHE["by_id"].setdefault(question.get("id"), []).append(question)
+    _QUESTIONS_CACHE["max_id"] = max(_QUESTIONS_CACHE["max_id"], question.get("id", 0))
+    _questions_changed()
+    return True
+
+def update_question(original, question):
+    """Replace a cached question with an edited copy; False if it was deleted meanwhile"""
+    _load_questions()
+    group = _QUESTIONS_CACHE["by_id"].get(original.get("id"), [])
+    for index, cached in enumerate(group):
+        if cached is original:
+            group[index] = question
+            _questions_changed()
+            return True
+    return False
+
+def _questions_snapshot():
+    """Take the questions to flush, or None if nothing changed; call where the cache is changed"""
+    if not _QUESTIONS_CACHE["dirty"]:
+        return None
+    # Cleared first, so changes made from here on mark it dirty again
+    _QUESTIONS_CACHE["dirty"] = False
+    _QUESTIONS_CACHE["writing"] = True
+    return _questions_view()
+
+def _write_questions(questions):
+    """Write a question snapshot to the JSON file"""
+    with _FLUSH_LOCK:
+        try:
+            _atomic_write(QUESTIONS_FILE, _dump_json(questions))
+            # Keep the saved list as the cached copy so it isn't read straight back
+            _QUESTIONS_CACHE["stamp"] = _file_stamp(QUESTIONS_FILE)
+            logger.info(f"Saved {len(questions)} questions")
+            return True
+        except Exception as e:
+            _QUESTIONS_CACHE["dirty"] = True
+            logger.error(f"Error saving questions: {e}")
+            return False
+        finally:
+            _QUESTIONS_CACHE["writing"] = False
+
+def flush_questions():
+    """Write pending question changes to the JSON file"""
+    questions = _questions_snapshot()
+    if questions is None:
         return True
-    except Exception as e:
-        logger.error(f"Error saving questions: {e}")
-        return False
+    return _write_questions(questions)
+
+async def _flush_all():
+    """Snapshot pending changes on the loop and write them on the I/O thread"""
+    loop = asyncio.get_running_loop()
+    questions = _questions_snapshot()
+    if questions is not None:
+        await loop.run_in_executor(_IO_EXECUTOR, _write_questions, questions)
+    users = _users_snapshot()
+    if users is not None:
+        await loop.run_in_executor(_IO_EXECUTOR, _write_users, users)
+
+async def _flusher():
+    """Periodically write pending question and user changes to disk"""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await _flush_all()
 
 def get_next_question_id():
     """Get the next available question ID"""
-    questions = load_questions()
-    if not questions:
-        return 1
-    return max(q.get("id", 0) for q in questions) + 1
+    _load_questions()
+    return _QUESTIONS_CACHE["max_id"] + 1
 
 def get_question_by_id(question_id):
-    """Get a question by its ID"""
-    questions = load_questions()
-    for question in questions:
-        if question.get("id") == question_id:
-            return question
-    return None
+    """Get a question by its ID, the first one when several share it"""
+    _load_questions()
+    group = _QUESTIONS_CACHE["by_id"].get(question_id)
+    return group[0] if group else None
 
 def delete_question_by_id(question_id):
     """Delete a question by its ID"""
-    questions = load_questions()
-    updated_questions = [q for q in questions if q.get("id") != question_id]
-    if len(updated_questions) < len(questions):
-        save_questions(updated_questions)
-        return True
-    return False
+    _load_questions()
+    if _QUESTIONS_CACHE["by_id"].pop(question_id, None) is None:
+        return False
+    _questions_changed()
+    return True
+
+def _parse_embed_page(html):
+    """Pull the message text, og:title and message paragraphs out of an embed page"""
+    if HTMLParser:
+        tree = HTMLParser(html)
+        node = tree.css_first('.tgme_widget_message_text')
+        meta = tree.css_first('meta[property="og:title"]')
+        return (
+            node.text() if node else None,
+            (meta.attributes.get('content') or '') if meta else '',
+            [p.text().strip() for p in tree.css('.tgme_widget_message_text p')]
+        )
+    soup = BeautifulSoup(html, 'html.parser')
+    node = soup.select_one('.tgme_widget_message_text')
+    meta = soup.select_one('meta[property="og:title"]')
+    return (
+        node.get_text() if node else None,
+        meta.get('content', '') if meta else '',
+        [p.get_text().strip() for p in soup.select('.tgme_widget_message_text p')]
+    )
+
+async def start_pyrogram_client():
+    """Start the shared Pyrogram client if API credentials are configured"""
+    global _PYROGRAM_CLIENT
+    api_id = os.getenv('API_ID')
+    api_hash = os.getenv('API_HASH')
+    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    if not (Client and api_id and api_hash and bot_token):
+        return
+    try:
+        client = Client(
+            "quiz_bot_client",
+            api_id=api_id,
+            api_hash=api_hash,
+            bot_token=bot_token,
+            in_memory=True,
+            # Only used to read messages; PTB owns this bot's updates
+            no_updates=True
+        )
+        await client.start()
+        _PYROGRAM_CLIENT = client
+    except Exception as e:
+        logger.error(f"Could not start Pyrogram client: {e}")
+
+async def stop_pyrogram_client():
+    """Stop the shared Pyrogram client"""
+    global _PYROGRAM_CLIENT
+    if _PYROGRAM_CLIENT:
+        client, _PYROGRAM_CLIENT = _PYROGRAM_CLIENT, None
+        await client.stop()
 
-def parse_telegram_quiz_url(url):
+async def parse_telegram_quiz_url(url):
+    """Parse a Telegram quiz URL, reusing recent results for the same URL"""
+    now = time.monotonic()
+    cached = _URL_CACHE.get(url)
+    if cached and cached[0] > now:
+        _URL_CACHE.move_to_end(url)
+        result = cached[1]
+    else:
+        result = await _extract_telegram_quiz(url)
+        if len(_URL_CACHE) >= URL_CACHE_SIZE:
+            # Drop expired entries first, then the least recently used if still full
+            for key in [k for k, (expires, _) in _URL_CACHE.items() if expires <= now]:
+                del _URL_CACHE[key]
+            if len(_URL_CACHE) >= URL_CACHE_SIZE:
+                _URL_CACHE.popitem(last=False)
+        _URL_CACHE[url] = (now + (URL_CACHE_TTL if result else URL_CACHE_MISS_TTL), result)
+        _URL_CACHE.move_to_end(url)
+    # Hand out a copy so the caller's edits don't leak into the cache
+    return {**result, "options": list(result["options"])} if result else None
+
+async def _extract_telegram_quiz(url):
     """Parse a Telegram quiz URL to extract question and options"""
     try:
         # Basic URL validation
@@ -115,19 +387,11 @@ def parse_telegram_quiz_url(url):
         # Try different methods to extract quiz content
         logger.info(f"Attempting to extract quiz from URL: {url}")
         
-        # Method 1: Try to use Telegram API (Pyrogram) if credentials are available
-        api_id = os.getenv('API_ID')
-        api_hash = os.getenv('API_HASH')
-        bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        
-        if api_id and api_hash and bot_token:
+        # Method 1: Try to use Telegram API (Pyrogram) if the shared client is running
+        if _PYROGRAM_CLIENT:
             try:
-                from pyrogram import Client
-                import asyncio
-                
                 # Extract channel username and message ID from URL
-                channel_pattern = r't\.me/([^/]+)/(\d+)'
-                channel_match = re.search(channel_pattern, url)
+                channel_match = _CHANNEL_RE.search(url)
                 
                 if channel_match:
                     channel_name = channel_match.group(1)
@@ -136,56 +400,46 @@ def parse_telegram_quiz_url(url):
                     # Function to get message using Pyrogram
                     async def get_quiz_message():
                         logger.info(f"Trying to fetch message from {channel_name}, ID: {message_id}")
-                        async with Client(
-                            "quiz_bot_client",
-                            api_id=api_id,
-                            api_hash=api_hash,
-                            bot_token=bot_token,
-                            in_memory=True
-                        ) as app:
-                            try:
-                                message = await app.get_messages(channel_name, message_id)
-                                if message:
-                                    # If it's a poll message
-                                    if message.poll:
-                                        return {
-                                            "question": message.poll.question,
-                                            "options": [opt.text for opt in message.poll.options],
-                                            "answer": 0  # Default, user will select correct answer
-                                        }
-                                    # If it's a text message that might contain quiz info
-                                    elif message.text:
-                                        # Try to parse text as quiz (question + options format)
-                                        lines = message.text.strip().split('\n')
-                                        if len(lines) >= 3:  # At least 1 question and 2 options
-                                            question = lines[0]
-                                            options = []
-                                            
-                                            # Extract options (look for numbered/lettered options)
-                                            for line in lines[1:]:
-                                                line = line.strip()
-                                                # Remove common option prefixes
-                                                line = re.sub(r'^[a-z][\.\)]\s*', '', line)
-                                                line = re.sub(r'^\d+[\.\)]\s*', '', line)
-                                                if line:
-                                                    options.append(line)
-                                            
-                                            if len(options) >= 2:
-                                                return {
-                                                    "question": question,
-                                                    "options": options,
-                                                    "answer": 0
-                                                }
-                            except Exception as e:
-                                logger.error(f"Error getting message with Pyrogram: {e}")
-                                return None
+                        try:
+                            message = await _PYROGRAM_CLIENT.get_messages(channel_name, message_id)
+                            if message:
+                                # If it's a poll message
+                                if message.poll:
+                                    return {
+                                        "question": message.poll.question,
+                                        "options": [opt.text for opt in message.poll.options],
+                                        "answer": 0  # Default, user will select correct answer
+                                    }
+                                # If it's a text message that might contain quiz info
+                                elif message.text:
+                                    # Try to parse text as quiz (question + options format)
+                                    lines = message.text.strip().split('\n')
+                                    if len(lines) >= 3:  # At least 1 question and 2 options
+                                        question = lines[0]
+                                        options = []
+                                        
+                                        # Extract options (look for numbered/lettered options)
+                                        for line in lines[1:]:
+                                            line = line.strip()
+                                            # Remove common option prefixes
+                                            line = _OPT_ALPHA_RE.sub('', line)
+                                            line = _OPT_NUM_RE.sub('', line)
+                                            if line:
+                                                options.append(line)
+                                        
+                                        if len(options) >= 2:
+                                            return {
+                                                "question": question,
+                                                "options": options,
+                                                "answer": 0
+                                            }
+                        except Exception as e:
+                            logger.error(f"Error getting message with Pyrogram: {e}")
+                            return None
                         return None
                     
-                    # Run the async function
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    result = loop.run_until_complete(get_quiz_message())
-                    loop.close()
+                    # Run on the bot's own loop instead of a throwaway one
+                    result = await get_quiz_message()
                     
                     if result:
                         logger.info(f"Successfully extracted quiz via Pyrogram: {result['question']}")
@@ -194,18 +448,14 @@ def parse_telegram_quiz_url(url):
                 logger.error(f"Pyrogram method failed: {e}")
         
         # Method 2: Enhanced web scraping with multiple patterns
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        }
-        
         # Try to get both the regular URL and the embedded version
         try:
-            response = requests.get(url, headers=headers)
+            response = await asyncio.to_thread(_HTTP.get, url, timeout=HTTP_TIMEOUT)
             content = response.text
             
             # First, look for standard poll format
-            poll_q_match = re.search(r'<div class="tgme_widget_message_poll_question">([^<]+)</div>', content)
-            poll_options = re.findall(r'<div class="tgme_widget_message_poll_option_text">([^<]+)</div>', content)
+            poll_q_match = _POLL_QUESTION_RE.search(content)
+            poll_options = _POLL_OPTION_RE.findall(content)
             
             if poll_q_match and poll_options and len(poll_options) >= 2:
                 question = poll_q_match.group(1).strip()
@@ -218,8 +468,7 @@ def parse_telegram_quiz_url(url):
             # If not a direct poll, try embedded view
             if "rajsthangk" in url or "gk" in url.lower() or "quiz" in url.lower():
                 # Try to extract channel and message_id
-                channel_pattern = r't\.me/([^/]+)/(\d+)'
-                channel_match = re.search(channel_pattern, url)
+                channel_match = _CHANNEL_RE.search(url)
                 
                 if channel_match:
                     channel_name = channel_match.group(1)
@@ -228,28 +477,25 @@ def parse_telegram_quiz_url(url):
                     # Try embedded view
                     embed_url = f"https://t.me/{channel_name}/{message_id}?embed=1"
                     try:
-                        embed_response = requests.get(embed_url, headers=headers)
+                        embed_response = await asyncio.to_thread(_HTTP.get, embed_url, timeout=HTTP_TIMEOUT)
                         embed_content = embed_response.text
                         
                         # Try to find quiz in embedded view
-                        from bs4 import BeautifulSoup
-                        soup = BeautifulSoup(embed_content, 'html.parser')
+                        message_text, og_title, paragraphs = _parse_embed_page(embed_content)
                         
                         # Look for message text that might contain quiz
-                        message_text = soup.select_one('.tgme_widget_message_text')
                         if message_text:
-                            text = message_text.get_text().strip()
+                            text = message_text.strip()
                             lines = [line.strip() for line in text.split('\n') if line.strip()]
                             
                             if lines and len(lines) >= 3:  # At least question + 2 options
                                 question = lines[0]
                                 
                                 # Check if this looks like a quiz (has options with A), B), 1., 2., etc.)
-                                option_pattern = re.compile(r'^[A-Za-z0-9][\.\)]')
                                 options = []
                                 for line in lines[1:]:
                                     # Remove option markers
-                                    clean_line = re.sub(r'^[A-Za-z0-9][\.\)]\s*', '', line)
+                                    clean_line = _OPT_ANY_RE.sub('', line)
                                     if clean_line:
                                         options.append(clean_line)
                                 
@@ -262,14 +508,11 @@ def parse_telegram_quiz_url(url):
                                     }
                         
                         # For RAJ GK QUIZ HOUSE format, look for quiz title
-                        page_title = soup.select_one('meta[property="og:title"]')
-                        if page_title and "quiz" in page_title.get('content', '').lower():
-                            title = page_title.get('content', '').strip()
+                        if "quiz" in og_title.lower():
+                            title = og_title.strip()
                             
                             # Try to extract options from the page
-                            lines = []
-                            for p in soup.select('.tgme_widget_message_text p'):
-                                lines.append(p.get_text().strip())
+                            lines = paragraphs
                             
                             # If we have potential options
                             if lines and len(lines) >= 2:
@@ -288,14 +531,8 @@ def parse_telegram_quiz_url(url):
                 text_content = ' '.join(lines)
                 
                 # Try regex patterns for common quiz formats
-                quiz_patterns = [
-                    r'question:\s*([^\?]+\??)\s*options:(.+)',
-                    r'quiz:\s*([^\?]+\??)\s*a\)(.*?)b\)(.*?)c\)(.*?)(d\).*?)?$',
-                    r'([^\?]+\??)\s*a\.\s*(.*?)\s*b\.\s*(.*?)\s*c\.\s*(.*?)(\s*d\.\s*.*?)?$'
-                ]
-                
-                for pattern in quiz_patterns:
-                    match = re.search(pattern, text_content, re.IGNORECASE | re.DOTALL)
+                for pattern in _QUIZ_PATTERNS:
+                    match = pattern.search(text_content)
                     if match:
                         question = match.group(1).strip()
                         options = []
@@ -316,16 +553,25 @@ def parse_telegram_quiz_url(url):
         
         return None
     except Exception as e:
-        logger.error(f"Error in parse_telegram_quiz_url: {e}")
+        logger.error(f"Error in _extract_telegram_quiz: {e}")
         return None
 
 # User tracking functions
 def load_users():
     """Load user data from file"""
     try:
+        # Unflushed or half-written changes in memory are newer than anything on disk
+        if _USERS_CACHE["dirty"] or _USERS_CACHE["writing"]:
+            return _USERS_CACHE["data"]
         if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r', encoding='utf-8') as file:
-                users = json.load(file)
+            stamp = _file_stamp(USERS_FILE)
+            if stamp == _USERS_CACHE["stamp"]:
+                return _USERS_CACHE["data"]
+            
+            with open(USERS_FILE, 'rb') as file:
+                users = _load_json(file.read())
+            _USERS_CACHE["stamp"] = stamp
+            _USERS_CACHE["data"] = users
             return users
         else:
             return {}
@@ -334,14 +580,43 @@ def load_users():
         return {}
 
 def save_users(users):
-    """Save user data to file"""
-    try:
-        with open(USERS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(users, file, ensure_ascii=False, indent=4)
+    """Mark user data as changed; the flusher writes it to file"""
+    _USERS_CACHE["data"] = users
+    _USERS_CACHE["dirty"] = True
+    return True
+
+def _users_snapshot():
+    """Take a copy of the user data to flush, or None if nothing changed"""
+    if not _USERS_CACHE["dirty"] or _USERS_CACHE["data"] is None:
+        return None
+    _USERS_CACHE["dirty"] = False
+    _USERS_CACHE["writing"] = True
+    return dict(_USERS_CACHE["data"])
+
+def _write_users(users):
+    """Write a user data snapshot to file"""
+    with _FLUSH_LOCK:
+        try:
+            _atomic_write(USERS_FILE, _dump_json(users))
+            _USERS_CACHE["stamp"] = _file_stamp(USERS_FILE)
+            return True
+        except Exception as e:
+            _USERS_CACHE["dirty"] = True
+            logger.error(f"Error saving users: {e}")
+            return False
+        finally:
+            _USERS_CACHE["writing"] = False
+
+def flush_users():
+    """Write pending user data changes to file"""
+    users = _users_snapshot()
+    if users is None:
         return True
-    except Exception as e:
-        logger.error(f"Error saving users: {e}")
-        return False
+    return _write_users(users)
+
+# Don't lose changes made since the last flush if the process exits
+atexit.register(flush_questions)
+atexit.register(flush_users)
 
 def get_user_data(user_id):
     """Get data for a specific user"""
@@ -523,8 +798,8 @@ async def add_question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ANSWER
 
-async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle category selection callback"""
+async def add_question_category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle category selection callback for a newly added question"""
     query = update.callback_query
     await query.answer()
     
@@ -539,10 +814,8 @@ async def category_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
         "category": category
     }
     
-    # Load existing questions, add new one, and save
-    questions = load_questions()
-    questions.append(question_data)
-    success = save_questions(questions)
+    # Add the new question; it is saved by the background flusher
+    success = add_question(question_data)
     
     if success:
         await query.edit_message_text(
@@ -596,9 +869,10 @@ async def edit_question_select(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             return EDIT_SELECT
         
-        # Store the selected question and its index
-        selected_question = questions[selection]
+        # Edit a copy of the selected question so the cache only changes on save
+        selected_question = dict(questions[selection])
         context.user_data['edit_index'] = selection
+        context.user_data['edit_original'] = questions[selection]
         context.user_data['edit_question'] = selected_question
         
         # Show the question details
@@ -719,13 +993,8 @@ async def edit_question_update(update: Update, context: ContextTypes.DEFAULT_TYP
     elif edit_field == 'category':
         selected_question['category'] = update.message.text
     
-    # Update the question in the list
-    questions = context.user_data.get('questions', [])
-    edit_index = context.user_data.get('edit_index', 0)
-    questions[edit_index] = selected_question
-    
-    # Save the updated questions
-    success = save_questions(questions)
+    # Swap the edited copy in for the original question
+    success = update_question(context.user_data.get('edit_original'), selected_question)
     
     if success:
         await update.message.reply_text(
@@ -1362,7 +1631,7 @@ async def clone_from_url(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not url.startswith(('http://', 'https://', 't.me/')):
         if 't.me/' in url:
             # Extract and format it properly
-            match = re.search(r't\.me/([^/\s]+/\d+)', url)
+            match = _TME_PATH_RE.search(url)
             if match:
                 url = f"https://t.me/{match.group(1)}"
             else:
@@ -1391,7 +1660,7 @@ async def clone_from_url(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     # Try to parse the URL with a timeout to prevent hanging
     try:
-        quiz_data = parse_telegram_quiz_url(url)
+        quiz_data = await parse_telegram_quiz_url(url)
         
         # Update the progress message with results
         if not quiz_data:
@@ -1533,10 +1802,8 @@ async def clone_category_callback(update: Update, context: ContextTypes.DEFAULT_
         "category": category
     }
     
-    # Load existing questions, add new one, and save
-    questions = load_questions()
-    questions.append(question_data)
-    success = save_questions(questions)
+    # Add the new question; it is saved by the background flusher
+    success = add_question(question_data)
     
     if success:
         await query.edit_message_text(
@@ -1550,10 +1817,31 @@ async def clone_category_callback(update: Update, context: ContextTypes.DEFAULT_
             "❌ There was an error saving the question. Please try again."
         )
 
+async def post_init(application: Application) -> None:
+    """Start the background question flusher and the Pyrogram client"""
+    application.bot_data['flusher'] = asyncio.create_task(_flusher())
+    await start_pyrogram_client()
+
+async def post_shutdown(application: Application) -> None:
+    """Stop the flusher and Pyrogram client and write any pending changes"""
+    flusher = application.bot_data.pop('flusher', None)
+    if flusher:
+        flusher.cancel()
+    # Queued behind any write the cancelled flusher already handed to the I/O thread
+    await _flush_all()
+    _IO_EXECUTOR.shutdown()
+    await stop_pyrogram_client()
+
 def main() -> None:
     """Run the bot."""
     # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Add handlers
     application.add_handler(CommandHandler("start", start))
@@ -1601,7 +1889,7 @@ def main() -> None:
     application.add_handler(clone_conv_handler)
     
     # Add callback query handlers
-    application.add_handler(CallbackQueryHandler(category_callback, pattern=r"^category_"))
+    application.add_handler(CallbackQueryHandler(add_question_category_callback, pattern=r"^category_"))
     application.add_handler(CallbackQueryHandler(delete_callback, pattern=r"^delete_"))
     application.add_handler(CallbackQueryHandler(category_callback, pattern=r"^cat_"))
     application.add_handler(CallbackQueryHandler(clone_method_callback, pattern=r"^clone_"))
@@ -2119,11 +2407,10 @@ async def save_final_poll_question(update, context, custom_id=None):
     # Check if we're deliberately using an existing ID or auto-generating
     if existing_with_same_id and custom_id is None:
         # If auto ID and there's a duplicate, get a different ID
-        new_question["id"] = max(q.get("id", 0) for q in questions) + 1
+        new_question["id"] = get_next_question_id()
     
     # Add the new question
-    questions.append(new_question)
-    save_questions(questions)
+    add_question(new_question)
     
     # Clean up
     if 'pending_question' in context.user_data: